@@ -0,0 +1,356 @@
+"""
+In-process load test for the dashboard backend.
+
+Drives ``main.app`` with concurrent mixed traffic and reports throughput and
+latency percentiles per route. Run from the ``backend`` directory:
+
+    python -m benchmarks.loadtest --concurrency 32 --requests 2000 \
+        --mix dashboard=4,share=4,tnved=1,batch=1
+
+By default requests go through ``httpx.ASGITransport`` inside this process.
+With ``--uvicorn`` a local uvicorn server is started in a background thread
+and traffic goes over real HTTP instead.
+
+The app runs in a temporary copy of the ``backend`` data directory, so batch
+writes, the write-ahead log and its compaction never touch ``data/``.
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import random
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import anyio.to_thread
+import httpx
+
+API_PREFIX = "/api/v1"
+
+DEFAULT_MIX = "dashboard=4,share=4,tnved=1,batch=1"
+
+
+@dataclass
+class RouteStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def percentile(self, pct: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[rank]
+
+
+@dataclass
+class LoadState:
+    hs_codes: List[str]
+    batch_rows: List[Dict[str, str]]
+    share_ids: List[int] = field(default_factory=list)
+    stats: Dict[str, RouteStats] = field(
+        default_factory=lambda: defaultdict(RouteStats)
+    )
+
+
+Scenario = Callable[
+    [httpx.AsyncClient, LoadState], Awaitable[Tuple[str, httpx.Response]]
+]
+
+
+async def _create_dashboard(client: httpx.AsyncClient, state: LoadState):
+    hs_code = random.choice(state.hs_codes)
+    response = await client.post(
+        f"{API_PREFIX}/dashboard",
+        json={
+            "product": {"name": f"Товар {hs_code}", "code": hs_code},
+            "organization": {"name": "Load test", "inn": None},
+        },
+    )
+    if response.status_code == 200:
+        share_url = response.json()["dashboard"]["share_url"]
+        state.share_ids.append(int(share_url.rsplit("/", 1)[-1]))
+    return "POST /dashboard", response
+
+
+async def _retrieve_dashboard(client: httpx.AsyncClient, state: LoadState):
+    if not state.share_ids:
+        return await _create_dashboard(client, state)
+    uid = random.choice(state.share_ids)
+    response = await client.get(f"{API_PREFIX}/dashboard/{uid}")
+    return "GET /dashboard/{uid}", response
+
+
+async def _get_tnved(client: httpx.AsyncClient, state: LoadState):
+    response = await client.get(f"{API_PREFIX}/tnved")
+    return "GET /tnved", response
+
+
+async def _batch_import(client: httpx.AsyncClient, state: LoadState):
+    # Re-upload a slice of existing rows so the dataset does not drift.
+    rows = random.sample(state.batch_rows, min(50, len(state.batch_rows)))
+    output = io.StringIO()
+    writer = csv.DictWriter(
+        output, fieldnames=["hs_code", "country", "year", "volume", "quantity"]
+    )
+    writer.writeheader()
+    writer.writerows(rows)
+    response = await client.post(
+        f"{API_PREFIX}/import-by-country/batch-import",
+        # The bundled rows include countries missing from countries.csv
+        params={"allow_unknown_countries": "true"},
+        files={"file": ("batch.csv", output.getvalue().encode(), "text/csv")},
+    )
+    return "POST /import-by-country/batch-import", response
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "dashboard": _create_dashboard,
+    "share": _retrieve_dashboard,
+    "tnved": _get_tnved,
+    "batch": _batch_import,
+}
+
+
+def parse_mix(raw: str) -> Dict[str, int]:
+    mix: Dict[str, int] = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown scenario '{name}', expected one of {sorted(SCENARIOS)}"
+            )
+        mix[name] = int(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise argparse.ArgumentTypeError("Traffic mix must have a positive weight")
+    return mix
+
+
+def _load_fixtures() -> Tuple[List[str], List[Dict[str, str]]]:
+    with open("data/import_by_country.csv", "r", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    hs_codes = sorted({row["hs_code"] for row in rows})
+    return hs_codes, rows
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    state: LoadState,
+    mix: Dict[str, int],
+    budget: Callable[[], bool],
+):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while budget():
+        scenario = SCENARIOS[random.choices(names, weights=weights)[0]]
+        started = time.perf_counter()
+        try:
+            route, response = await scenario(client, state)
+            failed = response.status_code >= 400
+        except Exception:
+            route, failed = scenario.__name__, True
+        elapsed = time.perf_counter() - started
+        stats = state.stats[route]
+        stats.latencies.append(elapsed)
+        if failed:
+            stats.errors += 1
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    mix: Dict[str, int],
+    concurrency: int,
+    total_requests: Optional[int],
+    duration: Optional[float],
+    warmup: int,
+) -> Tuple[LoadState, float]:
+    hs_codes, batch_rows = _load_fixtures()
+    state = LoadState(hs_codes=hs_codes, batch_rows=batch_rows)
+
+    for _ in range(warmup):
+        await _create_dashboard(client, state)
+
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    def budget() -> bool:
+        nonlocal issued
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        if total_requests is not None:
+            if issued >= total_requests:
+                return False
+            issued += 1
+        return True
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(_worker(client, state, mix, budget) for _ in range(concurrency))
+    )
+    return state, time.perf_counter() - started
+
+
+def format_report(state: LoadState, elapsed: float, concurrency: int) -> str:
+    header = (
+        f"{'route':<40} {'count':>7} {'err':>5} {'rps':>8} "
+        f"{'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+    )
+    lines = [header, "-" * len(header)]
+    total = 0
+    errors = 0
+    for route in sorted(state.stats):
+        stats = state.stats[route]
+        count = len(stats.latencies)
+        total += count
+        errors += stats.errors
+        lines.append(
+            f"{route:<40} {count:>7} {stats.errors:>5} {count / elapsed:>8.1f} "
+            f"{statistics.fmean(stats.latencies) * 1000:>8.2f} "
+            f"{stats.percentile(50) * 1000:>8.2f} "
+            f"{stats.percentile(95) * 1000:>8.2f} "
+            f"{stats.percentile(99) * 1000:>8.2f} "
+            f"{max(stats.latencies) * 1000:>8.2f}"
+        )
+    lines.append("-" * len(header))
+    lines.append(
+        f"total: {total} requests, {errors} errors in {elapsed:.2f}s "
+        f"({total / elapsed:.1f} req/s, concurrency={concurrency}); latencies in ms"
+    )
+    return "\n".join(lines)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_uvicorn(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _use_scratch_data() -> str:
+    """Run from a temporary copy of data/ (and .env); returns its directory."""
+    scratch = tempfile.mkdtemp(prefix="loadtest-")
+    shutil.copytree("data", os.path.join(scratch, "data"))
+    if os.path.exists(".env"):
+        shutil.copy(".env", scratch)
+    os.chdir(scratch)
+    return scratch
+
+
+async def main_async(args: argparse.Namespace):
+    from main import app
+
+    if args.threads:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = args.threads
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+
+    server = None
+    if args.uvicorn:
+        port = _free_port()
+        server, thread = _start_uvicorn(app, port)
+        client = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=timeout
+        )
+    else:
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://loadtest",
+            limits=limits,
+            timeout=timeout,
+        )
+
+    try:
+        async with client:
+            state, elapsed = await run_load(
+                client,
+                mix=args.mix,
+                concurrency=args.concurrency,
+                total_requests=None if args.duration else args.requests,
+                duration=args.duration,
+                warmup=args.warmup,
+            )
+    finally:
+        if server is not None:
+            server.should_exit = True
+            thread.join(timeout=5)
+
+    print(format_report(state, elapsed, args.concurrency))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--requests", type=int, default=1000, help="total requests to issue"
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="run for this many seconds instead of a fixed request count",
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix(DEFAULT_MIX),
+        help=f"weighted traffic mix, e.g. '{DEFAULT_MIX}'",
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=5, help="dashboards to create before measuring"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="override the threadpool size used for sync handlers",
+    )
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument(
+        "--uvicorn",
+        action="store_true",
+        help="serve the app with a local uvicorn server instead of ASGI transport",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = build_parser().parse_args()
+    if arguments.seed is not None:
+        random.seed(arguments.seed)
+    # Before the app is imported: its paths are relative to the working directory
+    scratch_dir = _use_scratch_data()
+    try:
+        asyncio.run(main_async(arguments))
+    finally:
+        # A compaction started by the last writes may still be folding the log
+        for thread in threading.enumerate():
+            if thread.name == "wal-compaction":
+                thread.join()
+        os.chdir(os.path.dirname(scratch_dir))
+        shutil.rmtree(scratch_dir, ignore_errors=True)
@@ -0,0 +1,104 @@
+"""
+Memory and load-time benchmark for source rows.
+
+Generates a synthetic ``import_by_country`` CSV and loads it twice: once into
+the Pydantic API models (how ``SourceData`` stored rows before) and once into
+the slotted row classes it stores now. Run from the ``backend`` directory:
+
+    python -m benchmarks.source_memory --rows 1000000
+"""
+
+import argparse
+import csv
+import gc
+import io
+import random
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from models.source import ImportByCountry
+from services.source_service import ROW_PARSERS
+
+COUNTRIES = ["CN", "DE", "BY", "KZ", "TR", "IT", "US", "JP", "KR", "IN"]
+
+
+def generate_csv(rows: int, hs_codes: int) -> str:
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["hs_code", "country", "year", "volume", "quantity"])
+    codes = [f"{random.randint(10**9, 10**10 - 1)}" for _ in range(hs_codes)]
+    for i in range(rows):
+        writer.writerow(
+            [
+                codes[i % hs_codes],
+                random.choice(COUNTRIES),
+                2015 + i % 10,
+                round(random.uniform(0, 1000), 3),
+                float(random.randint(0, 100000)),
+            ]
+        )
+    return output.getvalue()
+
+
+def _parse_model(row: Dict[str, str]) -> ImportByCountry:
+    return ImportByCountry(
+        hs_code=row["hs_code"],
+        country=row["country"],
+        year=int(row["year"]),
+        volume=float(row["volume"]),
+        quantity=float(row["quantity"]),
+    )
+
+
+def _load(content: str, parse: Callable[[Dict[str, str]], object]) -> List[object]:
+    return [parse(row) for row in csv.DictReader(io.StringIO(content))]
+
+
+def measure(
+    content: str, parse: Callable[[Dict[str, str]], object]
+) -> Tuple[float, int]:
+    """Load time in seconds and bytes retained by the loaded rows."""
+    gc.collect()
+    started = time.perf_counter()
+    rows = _load(content, parse)
+    elapsed = time.perf_counter() - started
+    del rows
+    gc.collect()
+
+    # Separate pass: tracing allocations slows loading down severalfold
+    tracemalloc.start()
+    rows = _load(content, parse)
+    retained, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return elapsed, retained
+
+
+def main(args: argparse.Namespace):
+    random.seed(args.seed)
+    content = generate_csv(args.rows, args.hs_codes)
+    candidates = [
+        ("pydantic ImportByCountry", _parse_model),
+        ("ImportByCountryRow", ROW_PARSERS["import_by_country"]),
+    ]
+    print(f"{args.rows} rows, {args.hs_codes} hs_codes")
+    print(f"{'representation':<26}{'load s':>10}{'MiB':>10}{'bytes/row':>12}")
+    for name, parse in candidates:
+        elapsed, retained = measure(content, parse)
+        print(
+            f"{name:<26}{elapsed:>10.2f}{retained / 2**20:>10.1f}"
+            f"{retained / args.rows:>12.1f}"
+        )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--hs-codes", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser
+
+
+if __name__ == "__main__":
+    main(build_parser().parse_args())
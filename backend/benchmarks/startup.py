@@ -0,0 +1,161 @@
+"""
+Startup benchmark for the dashboard backend.
+
+Starts fresh interpreters that ``import main`` (which builds the app) and
+serve one request to ``/``, and fails when the median exceeds the budget or
+when modules that should load lazily were imported at startup. Run from the
+``backend`` directory:
+
+    python -m benchmarks.startup --runs 5 --budget-ms 1000
+
+``--profile`` also prints the slowest imports from ``python -X importtime``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Optional dependencies that must not be imported just to start the app
+DEFAULT_LAZY_MODULES = "httpx"
+
+
+async def _first_request(app) -> int:
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 8000),
+    }
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+
+def child(lazy_modules: List[str]):
+    """Runs in the measured interpreter; prints one JSON line."""
+    started = time.perf_counter()
+    import main
+
+    imported = time.perf_counter()
+    status = asyncio.run(_first_request(main.app))
+    served = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "import_ms": (imported - started) * 1000,
+                "first_request_ms": (served - imported) * 1000,
+                "status": status,
+                "loaded_lazy_modules": [m for m in lazy_modules if m in sys.modules],
+            }
+        )
+    )
+
+
+def _run_child(lazy_modules: List[str]) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child"]
+        + ["--lazy-modules", ",".join(lazy_modules)],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(limit: int) -> List[Tuple[int, int, str]]:
+    """Slowest imports of ``import main`` as (self us, cumulative us, module)."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        rows.append((int(self_us), int(cumulative_us), module.rstrip()))
+    rows.sort(key=lambda row: row[1], reverse=True)
+    return rows[:limit]
+
+
+def main(args: argparse.Namespace) -> int:
+    lazy_modules = [m for m in args.lazy_modules.split(",") if m]
+    if args.child:
+        child(lazy_modules)
+        return 0
+
+    if args.profile:
+        print(f"{'self ms':>9}{'cumul ms':>10}  module")
+        for self_us, cumulative_us, module in import_profile(args.profile_limit):
+            print(f"{self_us / 1000:>9.1f}{cumulative_us / 1000:>10.1f}  {module}")
+        print()
+
+    runs = [_run_child(lazy_modules) for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    first_request_ms = statistics.median(run["first_request_ms"] for run in runs)
+    total_ms = import_ms + first_request_ms
+    print(f"{args.runs} runs, median")
+    print(f"{'import main':<22}{import_ms:>10.1f} ms")
+    print(f"{'first request':<22}{first_request_ms:>10.1f} ms")
+    print(f"{'total':<22}{total_ms:>10.1f} ms  (budget {args.budget_ms:.0f} ms)")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"startup took {total_ms:.1f} ms, over {args.budget_ms} ms")
+    if any(run["status"] != 200 for run in runs):
+        failures.append("first request did not return 200")
+    loaded = sorted({m for run in runs for m in run["loaded_lazy_modules"]})
+    if loaded:
+        failures.append(f"imported at startup: {', '.join(loaded)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument(
+        "--lazy-modules",
+        default=DEFAULT_LAZY_MODULES,
+        help="Comma-separated modules that must not be loaded at startup",
+    )
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--profile-limit", type=int, default=25)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(build_parser().parse_args()))
@@ -6,7 +6,35 @@ class Settings(BaseSettings):
     version: str = "1.0.0"
     debug: bool = False
     ui_base_url: str = "http://localhost:8000"
+    api_base_url: str = "http://localhost:8000"
     dadata_api_key: str = ""
+    profile_token: str = ""
+    profile_history_size: int = 50
+    tracing_enabled: bool = False
+    tracing_file: str = "logs/traces.jsonl"
+    tracing_max_bytes: int = 10 * 1024 * 1024
+    tracing_backup_count: int = 5
+    scenario_max_evaluations: int = 200_000
+    similar_cases_top_k: int = 3
+    query_max_rows_scanned: int = 1_000_000
+    query_max_groups: int = 100_000
+    sse_keepalive_seconds: float = 15.0
+    sse_debounce_seconds: float = 0.5
+    wal_enabled: bool = True
+    wal_file: str = "data/source.wal"
+    wal_compact_bytes: int = 64 * 1024 * 1024
+    data_watch_enabled: bool = True
+    data_watch_interval_seconds: float = 2.0
+    admission_enabled: bool = True
+    admission_heavy_concurrency: int = 4
+    admission_heavy_queue: int = 16
+    admission_light_concurrency: int = 32
+    admission_light_queue: int = 256
+    admission_queue_timeout_seconds: float = 10.0
+    admission_retry_after_seconds: int = 5
+    job_workers: int = 2
+    job_queue_size: int = 32
+    job_file_ttl_seconds: int = 3600
 
     class Config:
         env_file = ".env"
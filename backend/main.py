@@ -1,11 +1,37 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from config import settings
 from routes.dashboard_routes import router as dashboard_router
 from routes.source_routes import router as source_router
 from routes.utilities_routes import router as utilities_router
+from routes.screening_routes import router as screening_router
+from routes.scenario_routes import router as scenario_router
+from routes.query_routes import router as query_router
+from routes.job_routes import router as job_router
+from routes.metrics_routes import router as metrics_router
+from routes.debug_routes import router as debug_router
+from services.metrics_service import MetricsMiddleware
+from services.profiling_service import ProfilingMiddleware
+from services.tracing_service import TracingMiddleware
+from services.data_watch_service import start_data_watcher, stop_data_watcher
+from routes.instrumented_route import InstrumentedRoute
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title=settings.app_title, version=settings.version, debug=settings.debug)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_data_watcher()
+    yield
+    stop_data_watcher()
+
+
+app = FastAPI(
+    title=settings.app_title,
+    version=settings.version,
+    debug=settings.debug,
+    lifespan=lifespan,
+)
+app.router.route_class = InstrumentedRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,10 +40,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TracingMiddleware)
 
 app.include_router(dashboard_router, prefix="/api/v1", tags=["dashboard"])
 app.include_router(source_router, prefix="/api/v1", tags=["source"])
 app.include_router(utilities_router, prefix="/api/v1", tags=["utils"])
+app.include_router(screening_router, prefix="/api/v1", tags=["screening"])
+app.include_router(scenario_router, prefix="/api/v1", tags=["scenarios"])
+app.include_router(query_router, prefix="/api/v1", tags=["query"])
+app.include_router(job_router, prefix="/api/v1", tags=["jobs"])
+app.include_router(debug_router, prefix="/api/v1", tags=["debug"])
+app.include_router(metrics_router, tags=["metrics"])
 
 
 @app.get("/")
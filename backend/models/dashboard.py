@@ -42,6 +42,22 @@ class ContractPriceItem(BaseModel):
     quantity: float
 
 
+class RegionShareItem(BaseModel):
+    year: int
+    region: str
+    volume: float
+    quantity: float
+    share_percent: float
+
+
+class FriendlinessShareItem(BaseModel):
+    year: int
+    is_friendly: bool
+    volume: float
+    quantity: float
+    share_percent: float
+
+
 class ImpactMeasure(BaseModel):
     measure: str
     before: int
@@ -69,3 +85,5 @@ class DashboardData(BaseModel):
     prices: List[ContractPriceItem]
     recommendations: List[Recommendation]
     share_url: str
+    regions: List[RegionShareItem] = []
+    friendliness: List[FriendlinessShareItem] = []
@@ -1,5 +1,7 @@
-from typing import Union
-from pydantic import BaseModel, Field
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class CountryInfo(BaseModel):
@@ -30,8 +32,127 @@ class Restriction(BaseModel):
     value: Union[bool, float, int, str, None]
 
 
+class CodeDictionary:
+    """
+    Append-only mapping between code strings and dense integer ids.
+
+    Every row holding the same code shares one string object, and indexes
+    can key on the id instead of hashing and comparing strings.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, code: str) -> int:
+        code_id = self._ids.get(code)
+        if code_id is None:
+            with self._lock:
+                code_id = self._ids.get(code)
+                if code_id is None:
+                    code_id = len(self._codes)
+                    self._codes.append(code)
+                    self._ids[code] = code_id
+        return code_id
+
+    def lookup(self, code: str) -> Optional[int]:
+        """Id of an already known code, without registering new ones."""
+        return self._ids.get(code)
+
+    def code(self, code_id: int) -> str:
+        return self._codes[code_id]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+
+# Shared by every dataset version, so ids stay stable across reloads
+HS_CODES = CodeDictionary()
+COUNTRY_CODES = CodeDictionary()
+
+
+# Rows as stored in SourceData. The models above are validated at the HTTP
+# boundary only; millions of stored rows use these slotted dataclasses.
+# Codes are interned on construction; the *_id fields are derived from them.
+@dataclass(slots=True)
+class CountryInfoRow:
+    code: str
+    name: str
+    region: str
+    is_friendly: bool
+    country_id: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.country_id = COUNTRY_CODES.intern(self.code)
+        self.code = COUNTRY_CODES.code(self.country_id)
+
+
+@dataclass(slots=True)
+class ImportByCountryRow:
+    hs_code: str
+    country: str
+    year: int
+    volume: float
+    quantity: float
+    hs_id: int = field(init=False, repr=False, compare=False)
+    country_id: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.hs_id = HS_CODES.intern(self.hs_code)
+        self.hs_code = HS_CODES.code(self.hs_id)
+        self.country_id = COUNTRY_CODES.intern(self.country)
+        self.country = COUNTRY_CODES.code(self.country_id)
+
+
+@dataclass(slots=True)
+class VolumeGeneralRow:
+    hs_code: str
+    type: str
+    year: int
+    volume: float
+    hs_id: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.hs_id = HS_CODES.intern(self.hs_code)
+        self.hs_code = HS_CODES.code(self.hs_id)
+
+
+@dataclass(slots=True)
+class RestrictionRow:
+    hs_code: str
+    key: str
+    value: Union[bool, float, int, str, None]
+    hs_id: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.hs_id = HS_CODES.intern(self.hs_code)
+        self.hs_code = HS_CODES.code(self.hs_id)
+
+
 class SourceData(BaseModel):
-    countries: list[CountryInfo] = Field(default_factory=list)
-    import_by_country: list[ImportByCountry] = Field(default_factory=list)
-    volumes_general: list[VolumeGeneral] = Field(default_factory=list)
-    restrictions: list[Restriction] = Field(default_factory=list)
+    countries: list[CountryInfoRow] = Field(default_factory=list)
+    import_by_country: list[ImportByCountryRow] = Field(default_factory=list)
+    volumes_general: list[VolumeGeneralRow] = Field(default_factory=list)
+    restrictions: list[RestrictionRow] = Field(default_factory=list)
+
+    # Derived indexes built over this dataset (rollups, aggregations, ...)
+    _indexes: Dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    def get_index(self, name: str, build: Callable[["SourceData"], Any]) -> Any:
+        index = self._indexes.get(name)
+        if index is None:
+            index = self._indexes[name] = build(self)
+        return index
+
+    def peek_index(self, name: str) -> Optional[Any]:
+        return self._indexes.get(name)
+
+    def drop_index(self, name: str):
+        self._indexes.pop(name, None)
+
+    def take_index(self, name: str) -> Optional[Any]:
+        return self._indexes.pop(name, None)
+
+    def set_index(self, name: str, index: Any):
+        self._indexes[name] = index
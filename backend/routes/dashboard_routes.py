@@ -1,18 +1,68 @@
-from fastapi import APIRouter
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from schemas.dashboard_schemas import DashboardRequest, DashboardResponse
 from services.dashboard_service import (
+    DASHBOARD_SECTIONS,
+    SectionsUnavailableError,
+    StoredReport,
     create_report,
+    create_rollup_report,
+    get_region_breakdown,
+    get_stored_report,
     get_tnved_list_service,
-    retrieve_report,
+    report_json,
 )
+from services.dashboard_stream_service import dashboard_events
+from services.export_service import export_reports_ndjson
 from schemas.dashboard_schemas import (
     DashboardResponse,
     DashboardRequest,
+    RegionBreakdownResponse,
     TnvedListResponse,
 )
+from services.rollup_service import HS_LEVELS, normalize_hs_code
+from routes.instrumented_route import InstrumentedRoute
+from services.admission_service import HEAVY, admission_class
 
+router = APIRouter(route_class=InstrumentedRoute)
 
-router = APIRouter()
+FIELDS_QUERY = Query(
+    None,
+    description=(
+        "Comma-separated analytical sections to compute and return: "
+        + ", ".join(DASHBOARD_SECTIONS)
+        + ". Product, organization and share_url are always returned"
+    ),
+)
+COMPACT_QUERY = Query(
+    False,
+    description="Send each distinct reason list once, referenced by reasons_ref",
+)
+
+
+def _parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if fields is None:
+        return DASHBOARD_SECTIONS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in DASHBOARD_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown dashboard fields: {', '.join(unknown)}",
+        )
+    return tuple(dict.fromkeys(names))
+
+
+def _dashboard_response(stored: StoredReport, fields: Optional[str], compact: bool):
+    try:
+        if fields is None and not compact:
+            return DashboardResponse(dashboard=stored.data)
+        content = report_json(stored, _parse_fields(fields), compact)
+    except SectionsUnavailableError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return Response(content=content, media_type="application/json")
 
 
 @router.get("/tnved", response_model=TnvedListResponse)
@@ -22,12 +72,89 @@ def get_tnved_list():
 
 
 @router.post("/dashboard", response_model=DashboardResponse)
-def create_dashboard(request: DashboardRequest):
-    data = create_report(product=request.product, organization=request.organization)
-    return DashboardResponse(dashboard=data)
+def create_dashboard(
+    request: DashboardRequest,
+    fields: Optional[str] = FIELDS_QUERY,
+    compact: bool = COMPACT_QUERY,
+):
+    stored = create_report(
+        product=request.product,
+        organization=request.organization,
+        fields=_parse_fields(fields),
+    )
+    return _dashboard_response(stored, fields, compact)
+
+
+@router.post("/dashboard/rollup", response_model=DashboardResponse)
+def create_rollup_dashboard(
+    request: DashboardRequest,
+    fields: Optional[str] = FIELDS_QUERY,
+    compact: bool = COMPACT_QUERY,
+):
+    prefix = normalize_hs_code(request.product.code)
+    if not prefix.isdigit() or len(prefix) not in HS_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"HS prefix must be {', '.join(map(str, HS_LEVELS))} digits long",
+        )
+    stored = create_rollup_report(
+        product=request.product,
+        organization=request.organization,
+        fields=_parse_fields(fields),
+    )
+    return _dashboard_response(stored, fields, compact)
+
+
+@router.get("/dashboard/regions/{hs_code}", response_model=RegionBreakdownResponse)
+def get_dashboard_regions(hs_code: str):
+    regions, friendliness = get_region_breakdown(hs_code)
+    return RegionBreakdownResponse(
+        hs_code=normalize_hs_code(hs_code),
+        regions=regions,
+        friendliness=friendliness,
+    )
+
+
+@router.get("/dashboard/export")
+@admission_class(HEAVY)
+def export_dashboards(
+    after_id: int = Query(0, ge=0),
+    to_id: Optional[int] = Query(None, ge=1),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+):
+    headers = {"Content-Disposition": "attachment; filename=dashboards.ndjson"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        export_reports_ndjson(
+            after_id=after_id, to_id=to_id, since=since, until=until, compress=gzip
+        ),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
+
+
+@router.get("/dashboard/{uid}/events")
+@admission_class(None)
+async def stream_dashboard(uid: int):
+    try:
+        get_stored_report(uid)
+    except Exception:
+        raise HTTPException(status_code=404, detail="Dashboard not found")
+    return StreamingResponse(
+        dashboard_events(uid),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/dashboard/{uid}", response_model=DashboardResponse)
-def retrieve_dashboard(uid: int):
-    data = retrieve_report(uid)
-    return DashboardResponse(dashboard=data)
+def retrieve_dashboard(
+    uid: int,
+    fields: Optional[str] = FIELDS_QUERY,
+    compact: bool = COMPACT_QUERY,
+):
+    stored = get_stored_report(uid)
+    return _dashboard_response(stored, fields, compact)
@@ -0,0 +1,27 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from routes.instrumented_route import InstrumentedRoute
+from services.profiling_service import get_profile, is_profiling_allowed, list_profiles
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def _ensure_allowed(token: Optional[str]):
+    # Pretend the endpoints do not exist outside debug mode
+    if not is_profiling_allowed(token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/debug/profiles")
+def get_profiles(x_profile_token: Optional[str] = Header(None)):
+    _ensure_allowed(x_profile_token)
+    return list_profiles()
+
+
+@router.get("/debug/profiles/{profile_id}")
+def get_profile_report(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+    _ensure_allowed(x_profile_token)
+    report = get_profile(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
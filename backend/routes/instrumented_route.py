@@ -0,0 +1,153 @@
+import asyncio
+import functools
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import anyio.to_thread
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from config import settings
+from services.admission_service import (
+    ADMISSION_REJECTED,
+    LIGHT,
+    AdmissionPool,
+    AdmissionRejected,
+    get_admission_pool,
+)
+from services.profiling_service import get_active_profile
+from services.tracing_service import span, start_span, tracing_enabled
+
+
+class _EndpointTiming:
+    started_ns: Optional[int] = None
+    ended_ns: Optional[int] = None
+
+
+_endpoint_timing: ContextVar[Optional[_EndpointTiming]] = ContextVar(
+    "endpoint_timing", default=None
+)
+
+
+def _instrument_endpoint(endpoint, pool: Optional[AdmissionPool] = None):
+    if getattr(endpoint, "__instrumented__", False):
+        return endpoint
+
+    span_name = f"endpoint {endpoint.__name__}"
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            timing = _endpoint_timing.get()
+            if timing is not None:
+                timing.started_ns = time.time_ns()
+            try:
+                with span(span_name):
+                    profile = get_active_profile()
+                    if profile is None:
+                        return await endpoint(*args, **kwargs)
+                    return await profile.run_async(endpoint, *args, **kwargs)
+            finally:
+                if timing is not None:
+                    timing.ended_ns = time.time_ns()
+
+    else:
+
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            timing = _endpoint_timing.get()
+            if timing is not None:
+                timing.started_ns = time.time_ns()
+            try:
+                with span(span_name):
+                    profile = get_active_profile()
+                    if profile is None:
+                        return endpoint(*args, **kwargs)
+                    return profile.run_sync(endpoint, *args, **kwargs)
+            finally:
+                if timing is not None:
+                    timing.ended_ns = time.time_ns()
+
+        if pool is not None:
+            sync_wrapper = wrapper
+
+            # Run on the route class's own thread capacity; FastAPI would
+            # otherwise use the default threadpool shared by every route
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                return await anyio.to_thread.run_sync(
+                    functools.partial(sync_wrapper, *args, **kwargs),
+                    limiter=pool.thread_limiter,
+                )
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    Route that runs its endpoint under the request profiler and tracer.
+
+    Sync endpoints execute in a worker thread, so both have to be switched on
+    around the endpoint call itself rather than in middleware. When tracing,
+    the time spent before the endpoint (body parsing, validation) and after it
+    (response serialization) is recorded as separate spans.
+
+    Requests are admitted through the admission pool of the endpoint's route
+    class for their whole lifetime, streamed bodies included.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        pool = get_admission_pool(getattr(endpoint, "__admission_class__", LIGHT))
+        self.admission_pool = pool
+        # Light sync endpoints keep using the default threadpool
+        executor_pool = pool if pool is not None and pool.name != LIGHT else None
+        super().__init__(path, _instrument_endpoint(endpoint, executor_pool), **kwargs)
+
+    async def handle(self, scope, receive, send):
+        pool = self.admission_pool
+        if pool is None:
+            await super().handle(scope, receive, send)
+            return
+        try:
+            await pool.acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REJECTED.inc(route_class=pool.name, reason=e.reason)
+            response = JSONResponse(
+                {"detail": "Server is busy, retry later"},
+                status_code=503,
+                headers={"Retry-After": str(settings.admission_retry_after_seconds)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await super().handle(scope, receive, send)
+        finally:
+            pool.release()
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def instrumented_handler(request):
+            if not tracing_enabled():
+                return await handler(request)
+
+            timing = _EndpointTiming()
+            token = _endpoint_timing.set(timing)
+            started_ns = time.time_ns()
+            try:
+                return await handler(request)
+            finally:
+                ended_ns = time.time_ns()
+                _endpoint_timing.reset(token)
+                if timing.started_ns is not None:
+                    start_span("request.parse", start_ns=started_ns).end(
+                        timing.started_ns
+                    )
+                if timing.ended_ns is not None:
+                    start_span("response.serialize", start_ns=timing.ended_ns).end(
+                        ended_ns
+                    )
+
+        return instrumented_handler
@@ -0,0 +1,110 @@
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
+from config import settings
+from schemas.job_schemas import JobListResponse, JobStatus
+from schemas.scenario_schemas import ScenarioRequest, ScenarioResponse
+from services.batch_import_service import import_batch
+from services.job_service import JobFile, JobQueueFullError, job_queue
+from services.scenario_service import run_scenarios
+from services.source_service import table_csv
+from routes.instrumented_route import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+# URL names of the source tables, as in the source routes
+_TABLES = {
+    "import-by-country": "import_by_country",
+    "volume-general": "volumes_general",
+    "restriction": "restrictions",
+}
+
+
+def _table(name: str) -> str:
+    table = _TABLES.get(name)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Unknown table: {name}")
+    return table
+
+
+def submit_job(kind: str, work) -> JobStatus:
+    try:
+        return job_queue.submit(kind, work)
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Job queue is full: {e}",
+            headers={"Retry-After": str(settings.admission_retry_after_seconds)},
+        )
+
+
+@router.post("/jobs/batch-import/{table}", response_model=JobStatus, status_code=202)
+def submit_batch_import(
+    table: str,
+    file: UploadFile = File(...),
+    allow_unknown_countries: bool = Query(
+        False,
+        description="Accept country codes missing from countries.csv with a warning",
+    ),
+):
+    table = _table(table)
+    content = file.file.read()
+
+    def work(progress):
+        return import_batch(
+            table, content.decode("utf-8-sig"), progress, allow_unknown_countries
+        )
+
+    return submit_job("batch_import", work)
+
+
+@router.post("/jobs/export/{table}", response_model=JobStatus, status_code=202)
+def submit_export(table: str):
+    table = _table(table)
+
+    def work(progress):
+        return JobFile(table_csv(table, progress), f"{table}.csv", "text/csv")
+
+    return submit_job("export", work)
+
+
+@router.post("/jobs/scenarios", response_model=JobStatus, status_code=202)
+def submit_scenarios(request: ScenarioRequest):
+    def work(progress):
+        results, missing = run_scenarios(
+            request.scenarios,
+            hs_codes=request.hs_codes,
+            max_evaluations=settings.scenario_max_evaluations,
+            progress=progress,
+        )
+        return ScenarioResponse(
+            scenarios=[scenario.name for scenario in request.scenarios],
+            missing_codes=missing,
+            results=results,
+        )
+
+    return submit_job("scenarios", work)
+
+
+@router.get("/jobs", response_model=JobListResponse)
+def list_jobs():
+    return JobListResponse(items=job_queue.list())
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    status = job_queue.get(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+
+@router.get("/jobs/{job_id}/download")
+def download_job_file(job_id: str):
+    job_file = job_queue.get_file(job_id)
+    if job_file is None:
+        raise HTTPException(status_code=404, detail="No file for this job")
+    return FileResponse(
+        job_file.path,
+        media_type=job_file.media_type,
+        headers={"Content-Disposition": f"attachment; filename={job_file.filename}"},
+    )
@@ -0,0 +1,26 @@
+import anyio.to_thread
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from services.admission_service import admission_class
+from services.metrics_service import gauge, render_metrics
+from routes.instrumented_route import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+THREADPOOL_TOKENS = gauge(
+    "threadpool_tokens", "Threadpool capacity for sync handlers by state", ["state"]
+)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+@admission_class(None)
+async def get_metrics():
+    # The default limiter is bound to the event loop, so sample it here
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    stats = limiter.statistics()
+    THREADPOOL_TOKENS.set(limiter.total_tokens, state="total")
+    THREADPOOL_TOKENS.set(stats.borrowed_tokens, state="borrowed")
+    THREADPOOL_TOKENS.set(stats.tasks_waiting, state="waiting")
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
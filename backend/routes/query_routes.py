@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+from config import settings
+from schemas.query_schemas import AggregationQuery, AggregationResponse
+from services.query_service import QueryError, QueryTooLargeError, run_query
+from routes.instrumented_route import InstrumentedRoute
+from services.admission_service import HEAVY, admission_class
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+@router.post(
+    "/query", response_model=AggregationResponse, response_model_exclude_none=True
+)
+@admission_class(HEAVY)
+def aggregate_imports(query: AggregationQuery):
+    try:
+        return run_query(
+            query,
+            max_rows=settings.query_max_rows_scanned,
+            max_groups=settings.query_max_groups,
+        )
+    except QueryTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except QueryError as e:
+        raise HTTPException(status_code=422, detail=str(e))
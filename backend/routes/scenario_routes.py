@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException
+from config import settings
+from schemas.scenario_schemas import ScenarioRequest, ScenarioResponse
+from services.scenario_service import ScenarioTooLargeError, run_scenarios
+from routes.instrumented_route import InstrumentedRoute
+from services.admission_service import HEAVY, admission_class
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+@router.post("/scenarios", response_model=ScenarioResponse)
+@admission_class(HEAVY)
+def evaluate_scenarios(request: ScenarioRequest):
+    try:
+        results, missing = run_scenarios(
+            request.scenarios,
+            hs_codes=request.hs_codes,
+            max_evaluations=settings.scenario_max_evaluations,
+        )
+    except ScenarioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return ScenarioResponse(
+        scenarios=[scenario.name for scenario in request.scenarios],
+        missing_codes=missing,
+        results=results,
+    )
@@ -0,0 +1,26 @@
+from typing import List
+from fastapi import APIRouter, Query
+from schemas.screening_schemas import ScreeningResponse
+from services.recommendation_service import Measure
+from services.screening_service import screen_measures
+from routes.instrumented_route import InstrumentedRoute
+from services.admission_service import HEAVY, admission_class
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+@router.get("/screening", response_model=ScreeningResponse)
+@admission_class(HEAVY)
+def screen_catalogue(
+    measure: List[Measure] = Query(..., description="Measures to screen for"),
+    match_all: bool = Query(
+        False, description="Require every listed measure instead of any of them"
+    ),
+):
+    total_codes, items = screen_measures(measure, match_all=match_all)
+    return ScreeningResponse(
+        measures=[int(m) for m in measure],
+        match_all=match_all,
+        total_codes=total_codes,
+        items=items,
+    )
@@ -1,6 +1,5 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-import csv
-import io
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, UploadFile, File
 from models.source import (
     ImportByCountry,
     VolumeGeneral,
@@ -20,8 +19,56 @@ from services.source_service import (
     export_volume_general_csv,
     export_restriction_csv,
 )
+from schemas.batch_import_schemas import BatchImportReport
+from schemas.dataset_schemas import DatasetInfo
+from schemas.job_schemas import JobStatus
+from services.batch_import_service import MissingColumnsError, import_batch
+from services.dataset_service import get_dataset_info, run_dataset_replace
+from services.source_service import (
+    ChangesUnavailableError,
+    export_changes_csv,
+    rollback_source_data,
+)
+from routes.instrumented_route import InstrumentedRoute
+from routes.job_routes import submit_job
+from services.admission_service import HEAVY, admission_class
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def _export_changes(table: str, since_version: int):
+    try:
+        return export_changes_csv(table, since_version)
+    except ChangesUnavailableError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+
+_SINCE_VERSION = Query(
+    None,
+    ge=0,
+    description="Only rows upserted or deleted after this X-Source-Version",
+)
+
 
-router = APIRouter()
+_ALLOW_UNKNOWN_COUNTRIES = Query(
+    False,
+    description="Accept country codes missing from countries.csv with a warning",
+)
+
+
+def _batch_import(
+    table: str, file: UploadFile, allow_unknown_countries: bool = False
+) -> BatchImportReport:
+    try:
+        content = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=422, detail="File is not valid UTF-8")
+    try:
+        return import_batch(
+            table, content, allow_unknown_countries=allow_unknown_countries
+        )
+    except MissingColumnsError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 # ImportByCountry CRUD operations
@@ -113,65 +160,82 @@ def delete_restriction_item(hs_code: str, key: str):
 
 
 # ImportByCountry batch operations
-@router.post("/import-by-country/batch-import")
-def import_import_by_country_batch(file: UploadFile = File(...)):
-    content = file.file.read().decode("utf-8")
-    reader = csv.DictReader(io.StringIO(content))
-
-    for row in reader:
-        item = ImportByCountry(
-            hs_code=row["hs_code"],
-            country=row["country"],
-            year=int(row["year"]),
-            volume=float(row["volume"]),
-            quantity=float(row["quantity"]),
-        )
-        save_import_by_country(item)
-
-    return {"message": "Batch import completed successfully"}
+@router.post("/import-by-country/batch-import", response_model=BatchImportReport)
+@admission_class(HEAVY)
+def import_import_by_country_batch(
+    file: UploadFile = File(...),
+    allow_unknown_countries: bool = _ALLOW_UNKNOWN_COUNTRIES,
+):
+    return _batch_import("import_by_country", file, allow_unknown_countries)
 
 
 @router.get("/import-by-country/export-csv")
-def export_import_by_country_csv_file():
+@admission_class(HEAVY)
+def export_import_by_country_csv_file(since_version: Optional[int] = _SINCE_VERSION):
+    if since_version is not None:
+        return _export_changes("import_by_country", since_version)
     return export_import_by_country_csv()
 
 
 # VolumeGeneral batch operations
-@router.post("/volume-general/batch-import")
+@router.post("/volume-general/batch-import", response_model=BatchImportReport)
+@admission_class(HEAVY)
 def import_volume_general_batch(file: UploadFile = File(...)):
-    content = file.file.read().decode("utf-8")
-    reader = csv.DictReader(io.StringIO(content))
-
-    for row in reader:
-        item = VolumeGeneral(
-            hs_code=row["hs_code"],
-            type=row["type"],
-            year=int(row["year"]),
-            volume=float(row["volume"]),
-        )
-        save_volume_general(item)
-
-    return {"message": "Batch import completed successfully"}
+    return _batch_import("volumes_general", file)
 
 
 @router.get("/volume-general/export-csv")
-def export_volume_general_csv_file():
+@admission_class(HEAVY)
+def export_volume_general_csv_file(since_version: Optional[int] = _SINCE_VERSION):
+    if since_version is not None:
+        return _export_changes("volumes_general", since_version)
     return export_volume_general_csv()
 
 
 # Restriction batch operations
-@router.post("/restriction/batch-import")
+@router.post("/restriction/batch-import", response_model=BatchImportReport)
+@admission_class(HEAVY)
 def import_restriction_batch(file: UploadFile = File(...)):
-    content = file.file.read().decode("utf-8")
-    reader = csv.DictReader(io.StringIO(content))
-
-    for row in reader:
-        item = Restriction(hs_code=row["hs_code"], key=row["key"], value=row["value"])
-        save_restriction(item)
-
-    return {"message": "Batch import completed successfully"}
+    return _batch_import("restrictions", file)
 
 
 @router.get("/restriction/export-csv")
-def export_restriction_csv_file():
+@admission_class(HEAVY)
+def export_restriction_csv_file(since_version: Optional[int] = _SINCE_VERSION):
+    if since_version is not None:
+        return _export_changes("restrictions", since_version)
     return export_restriction_csv()
+
+
+# Full dataset replace
+@router.get("/dataset", response_model=DatasetInfo)
+def get_dataset():
+    return get_dataset_info()
+
+
+@router.post("/dataset", response_model=JobStatus, status_code=202)
+@admission_class(HEAVY)
+def replace_dataset(
+    countries: UploadFile = File(...),
+    import_by_country: UploadFile = File(...),
+    volumes_general: UploadFile = File(...),
+    restrictions: UploadFile = File(...),
+):
+    files = {
+        "countries": countries.file.read(),
+        "import_by_country": import_by_country.file.read(),
+        "volumes_general": volumes_general.file.read(),
+        "restrictions": restrictions.file.read(),
+    }
+    return submit_job(
+        "dataset_replace", lambda progress: run_dataset_replace(files, progress)
+    )
+
+
+@router.post("/dataset/rollback", response_model=DatasetInfo)
+def rollback_dataset():
+    if not rollback_source_data():
+        raise HTTPException(
+            status_code=409, detail="No previous dataset to roll back to"
+        )
+    return get_dataset_info()
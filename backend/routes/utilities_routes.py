@@ -1,9 +1,12 @@
 from pathlib import Path
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
-import httpx
 from config import settings
 import json
+from routes.instrumented_route import InstrumentedRoute
+from schemas.case_search_schemas import CaseSearchResponse
+from services.case_search_service import search_cases
 
 DADATA_URL = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/findById/party"
 
@@ -12,7 +15,7 @@ class PartyQuery(BaseModel):
     query: str
 
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 
 @router.get("/historical-similarities")
@@ -35,8 +38,31 @@ async def get_historical_similarities():
         raise HTTPException(status_code=500, detail=f"Error reading file: {str(e)}")
 
 
+@router.get("/historical-similarities/search", response_model=CaseSearchResponse)
+def search_historical_similarities(
+    q: str = Query(..., min_length=1, description="Search query"),
+    kind: Optional[str] = Query(
+        None,
+        pattern="^(thesis|product|measure)$",
+        description="Restrict results to theses, products or measures",
+    ),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """
+    Ranked full-text search over historical case theses, products and measures
+    """
+    try:
+        total, hits = search_cases(q, kind=kind, limit=limit)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    return CaseSearchResponse(query=q, total=total, hits=hits)
+
+
 @router.post("/company-info/")
 async def find_party(payload: PartyQuery):
+    # httpx is only needed here; importing it lazily keeps it out of startup
+    import httpx
+
     headers = {
         "Content-Type": "application/json",
         "Accept": "application/json",
@@ -0,0 +1,26 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class BatchRowError(BaseModel):
+    # CSV line number, header is line 1
+    line: int
+    # None for errors about the row as a whole (duplicates, short rows)
+    column: Optional[str] = None
+    message: str
+
+
+class BatchImportReport(BaseModel):
+    message: str
+    table: str
+    rows: int
+    inserted: int
+    updated: int
+    rejected: int
+    # Rejected values per column; "row" for whole-row errors
+    error_counts: Dict[str, int] = {}
+    # First errors only when errors_truncated is set
+    errors: List[BatchRowError] = []
+    errors_truncated: bool = False
+    # Accepted rows worth a look, e.g. country codes missing from countries.csv
+    warnings: List[str] = []
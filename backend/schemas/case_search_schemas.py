@@ -0,0 +1,17 @@
+from typing import List, Optional, Tuple
+from pydantic import BaseModel
+
+
+class CaseSearchHit(BaseModel):
+    kind: str
+    ref: Optional[str] = None
+    title: str
+    snippet: str
+    highlights: List[Tuple[int, int]]
+    score: float
+
+
+class CaseSearchResponse(BaseModel):
+    query: str
+    total: int
+    hits: List[CaseSearchHit]
@@ -1,6 +1,12 @@
 from typing import List
 from pydantic import BaseModel
-from models.dashboard import DashboardData, OrganizationInfo, ProductInfo
+from models.dashboard import (
+    DashboardData,
+    FriendlinessShareItem,
+    OrganizationInfo,
+    ProductInfo,
+    RegionShareItem,
+)
 
 
 class DashboardRequest(BaseModel):
@@ -19,3 +25,9 @@ class TnvedItem(BaseModel):
 
 class TnvedListResponse(BaseModel):
     items: List[TnvedItem]
+
+
+class RegionBreakdownResponse(BaseModel):
+    hs_code: str
+    regions: List[RegionShareItem]
+    friendliness: List[FriendlinessShareItem]
@@ -0,0 +1,28 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class DatasetError(BaseModel):
+    table: str
+    # CSV line number, header is line 1; None for table-level errors
+    line: Optional[int] = None
+    message: str
+
+
+class DatasetReplaceResult(BaseModel):
+    """Result of a ``dataset_replace`` job, also kept when the job failed."""
+
+    rows: Dict[str, int] = {}
+    errors: List[DatasetError] = []
+    # Accepted anomalies, e.g. import rows for countries missing in countries.csv
+    warnings: List[DatasetError] = []
+    # Dataset version after the switch
+    version: Optional[int] = None
+
+
+class DatasetInfo(BaseModel):
+    version: int
+    # Version of the last row change, as in X-Source-Version of exports
+    source_version: int
+    rows: Dict[str, int]
+    rollback_available: bool
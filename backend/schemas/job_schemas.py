@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Current step, e.g. "validating" then "applying" for a batch import;
+    # rows, throughput and ETA refer to this step. Scenario jobs count
+    # evaluations instead of rows
+    stage: Optional[str] = None
+    rows_total: Optional[int] = None
+    rows_processed: int = 0
+    rows_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    # Set when the job produced a file, e.g. a CSV export
+    download_url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class JobListResponse(BaseModel):
+    items: List[JobStatus]
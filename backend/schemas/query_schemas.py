@@ -0,0 +1,71 @@
+from enum import Enum
+from typing import Dict, List, Optional, Union
+from pydantic import BaseModel, Field
+
+
+class QueryDimension(str, Enum):
+    HS_CODE = "hs_code"
+    COUNTRY = "country"
+    REGION = "region"
+    IS_FRIENDLY = "is_friendly"
+    YEAR = "year"
+
+
+class QueryMetric(str, Enum):
+    VOLUME = "volume"
+    QUANTITY = "quantity"
+
+
+class QueryAggregate(str, Enum):
+    SUM = "sum"
+    MEAN = "mean"
+    COUNT = "count"
+    # Fraction of 1 of the filtered total (of the year's total when grouped by year)
+    SHARE = "share"
+    # Relative change against the same group in the previous year
+    YOY = "yoy"
+
+
+class QueryFilter(BaseModel):
+    # Exact codes or prefixes (chapter, heading, ...); any of them matches
+    hs_codes: Optional[List[str]] = None
+    hs_prefixes: Optional[List[str]] = None
+    countries: Optional[List[str]] = None
+    regions: Optional[List[str]] = None
+    is_friendly: Optional[bool] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+
+
+class AggregationQuery(BaseModel):
+    filter: QueryFilter = Field(default_factory=QueryFilter)
+    group_by: List[QueryDimension] = Field(default_factory=list)
+    # Group hs_code by its first digits (2 for chapters, 4 for headings)
+    hs_level: Optional[int] = Field(None, ge=2, le=10)
+    metric: QueryMetric = QueryMetric.VOLUME
+    aggregates: List[QueryAggregate] = Field(
+        default_factory=lambda: [QueryAggregate.SUM], min_length=1
+    )
+    # Defaults to the first aggregate; groups without a value go last
+    order_by: Optional[QueryAggregate] = None
+    descending: bool = True
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class AggregationRow(BaseModel):
+    group: Dict[str, Union[bool, int, str]]
+    sum: Optional[float] = None
+    mean: Optional[float] = None
+    count: Optional[int] = None
+    share: Optional[float] = None
+    yoy: Optional[float] = None
+
+
+class AggregationResponse(BaseModel):
+    group_by: List[QueryDimension]
+    metric: QueryMetric
+    rows_scanned: int
+    rows_matched: int
+    total_groups: int
+    truncated: bool
+    rows: List[AggregationRow]
@@ -0,0 +1,40 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+
+
+class ScenarioAdjustment(BaseModel):
+    name: str
+    # Raise the applied duty to the WTO bound
+    tariff_to_wto_bound: bool = False
+    # Absolute applied duty in percent; overrides tariff_to_wto_bound
+    applied_tariff: Optional[float] = None
+    # Relative changes of current-year values, e.g. -0.4 for a 40% drop
+    unfriendly_import_change: float = Field(0.0, ge=-1.0)
+    country_import_change: Dict[str, float] = Field(default_factory=dict)
+    production_change: float = Field(0.0, ge=-1.0)
+    consumption_change: float = Field(0.0, ge=-1.0)
+
+
+class ScenarioRequest(BaseModel):
+    # All hs_codes with import data when omitted
+    hs_codes: Optional[List[str]] = None
+    scenarios: List[ScenarioAdjustment] = Field(..., min_length=1)
+
+
+class ScenarioOutcome(BaseModel):
+    scenario: str
+    measures: List[int]
+    added: List[int]
+    removed: List[int]
+
+
+class ScenarioProductResult(BaseModel):
+    hs_code: str
+    baseline: List[int]
+    outcomes: List[ScenarioOutcome]
+
+
+class ScenarioResponse(BaseModel):
+    scenarios: List[str]
+    missing_codes: List[str]
+    results: List[ScenarioProductResult]
@@ -0,0 +1,28 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class ScreeningItem(BaseModel):
+    hs_code: str
+    measures: List[int]
+    current_year: int
+    total_import: float
+    unfriendly_share: float
+    unfriendly_share_previous: Optional[float] = None
+    production: float
+    consumption: float
+    applied_tariff: float
+    wto_tariff: float
+    tariff_headroom: float
+    top_supplier: Optional[str] = None
+    china_share: Optional[float] = None
+    china_share_avg_3y: Optional[float] = None
+    china_contract_price: Optional[float] = None
+    others_contract_price: Optional[float] = None
+
+
+class ScreeningResponse(BaseModel):
+    measures: List[int]
+    match_all: bool
+    total_codes: int
+    items: List[ScreeningItem]
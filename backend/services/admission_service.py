@@ -0,0 +1,101 @@
+from typing import Callable, Dict, Optional
+
+import anyio
+
+from config import settings
+from services.metrics_service import counter, gauge
+
+# Route classes; endpoints without a class are "light"
+HEAVY = "heavy"
+LIGHT = "light"
+
+ADMISSION_REJECTED = counter(
+    "admission_rejected_total",
+    "Requests answered with 503 by admission control",
+    ["route_class", "reason"],
+)
+ADMISSION_REQUESTS = gauge(
+    "admission_requests",
+    "Admitted and queued requests per route class",
+    ["route_class", "state"],
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, pool: "AdmissionPool", reason: str):
+        super().__init__(f"{pool.name} requests over capacity ({reason})")
+        self.pool = pool
+        self.reason = reason
+
+
+class AdmissionPool:
+    """
+    Concurrency limit with a bounded wait queue for one route class.
+
+    Sync handlers of the class run on their own thread capacity instead of
+    the default threadpool, so a burst of heavy work cannot starve light
+    requests of worker threads.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_queue = max_queue
+        self.limiter = anyio.CapacityLimiter(max_concurrency)
+        self.thread_limiter = anyio.CapacityLimiter(max_concurrency)
+
+    async def acquire(self):
+        if (
+            self.limiter.available_tokens < 1
+            and self.limiter.statistics().tasks_waiting >= self.max_queue
+        ):
+            raise AdmissionRejected(self, "queue_full")
+        try:
+            with anyio.fail_after(settings.admission_queue_timeout_seconds):
+                await self.limiter.acquire()
+        except TimeoutError:
+            raise AdmissionRejected(self, "queue_timeout")
+
+    def release(self):
+        self.limiter.release()
+
+    def samples(self):
+        stats = self.limiter.statistics()
+        return {
+            (self.name, "active"): stats.borrowed_tokens,
+            (self.name, "queued"): stats.tasks_waiting,
+        }
+
+
+_pools: Dict[str, AdmissionPool] = {
+    HEAVY: AdmissionPool(
+        HEAVY, settings.admission_heavy_concurrency, settings.admission_heavy_queue
+    ),
+    LIGHT: AdmissionPool(
+        LIGHT, settings.admission_light_concurrency, settings.admission_light_queue
+    ),
+}
+
+ADMISSION_REQUESTS.set_callback(
+    lambda: {
+        key: value for pool in _pools.values() for key, value in pool.samples().items()
+    }
+)
+
+
+def get_admission_pool(route_class: Optional[str]) -> Optional[AdmissionPool]:
+    if not settings.admission_enabled or route_class is None:
+        return None
+    return _pools[route_class]
+
+
+def admission_class(route_class: Optional[str]) -> Callable:
+    """
+    Mark an endpoint as ``HEAVY`` or ``LIGHT``, or ``None`` to exempt it
+    (long-lived streams, metrics). Place below the router decorator.
+    """
+
+    def decorate(endpoint):
+        endpoint.__admission_class__ = route_class
+        return endpoint
+
+    return decorate
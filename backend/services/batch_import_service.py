@@ -0,0 +1,308 @@
+import csv
+import io
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from models.source import ImportByCountryRow, RestrictionRow, VolumeGeneralRow
+from schemas.batch_import_schemas import BatchImportReport, BatchRowError
+from services.job_service import JobProgress
+from services.dataset_service import VOLUME_TYPES
+from services.rollup_service import HS_LEVELS, normalize_hs_code
+from services.source_service import (
+    TABLE_COLUMNS,
+    get_source_data,
+    parse_restriction_value,
+    upsert_rows,
+)
+
+TNVED_FILE = Path("data/tnved.csv")
+
+_MIN_YEAR = 1900
+_MAX_ERRORS = 1000
+# Rows validated per pass; bounds the temporary columns of large files
+_CHUNK_ROWS = 50_000
+
+# Row key per table; later rows with the key of an earlier one are rejected
+_TABLE_KEYS: Dict[str, Tuple[str, ...]] = {
+    "import_by_country": ("hs_code", "country", "year"),
+    "volumes_general": ("hs_code", "type", "year"),
+    "restrictions": ("hs_code", "key"),
+}
+
+_ROW_TYPES = {
+    "import_by_country": ImportByCountryRow,
+    "volumes_general": VolumeGeneralRow,
+    "restrictions": RestrictionRow,
+}
+
+_tnved_lock = threading.Lock()
+_tnved_prefixes: Optional[Tuple[float, FrozenSet[str]]] = None
+
+
+class MissingColumnsError(ValueError):
+    pass
+
+
+def _known_hs_prefixes() -> FrozenSet[str]:
+    """Chapters, headings and subheadings listed in tnved.csv."""
+    global _tnved_prefixes
+    mtime = TNVED_FILE.stat().st_mtime
+    with _tnved_lock:
+        if _tnved_prefixes is None or _tnved_prefixes[0] != mtime:
+            with open(TNVED_FILE, "r", encoding="utf-8") as f:
+                codes = [normalize_hs_code(row["code"]) for row in csv.DictReader(f)]
+            prefixes = frozenset(
+                code[:level] for code in codes for level in HS_LEVELS[:3]
+            )
+            _tnved_prefixes = (mtime, prefixes)
+        return _tnved_prefixes[1]
+
+
+class _Validator:
+    """
+    Checks a CSV one column at a time and collects errors per row.
+
+    Numeric columns are converted with a single ``map`` over the whole column
+    and only fall back to per-value parsing when that fails, so a clean
+    column costs one C-level pass.
+    """
+
+    def __init__(
+        self, table: str, records: List[List[str]], header: List[str], offset: int
+    ):
+        self.table = table
+        self.records = records
+        # Index of the first record in the file
+        self.offset = offset
+        self.positions = {name: i for i, name in enumerate(header)}
+        self.errors: Dict[int, List[Tuple[Optional[str], str]]] = {}
+        # Record index -> country code missing from countries.csv
+        self.unknown_countries: Dict[int, str] = {}
+        # Blank lines are skipped, not reported
+        self.blank = {i for i, record in enumerate(records) if not record}
+
+    def reject(self, i: int, column: Optional[str], message: str):
+        self.errors.setdefault(i, []).append((column, message))
+
+    def column(self, name: str) -> List[Optional[str]]:
+        position = self.positions[name]
+        values = [
+            record[position] if position < len(record) else None
+            for record in self.records
+        ]
+        for i, value in enumerate(values):
+            if value is None and i not in self.blank:
+                self.reject(i, name, "missing value")
+        return values
+
+    def numbers(self, name: str, cast: Callable) -> List:
+        values = self.column(name)
+        try:
+            return list(map(cast, values))
+        except (TypeError, ValueError):
+            pass
+        parsed = []
+        for i, value in enumerate(values):
+            try:
+                parsed.append(cast(value))
+            except ValueError:
+                self.reject(i, name, f"not a valid number: {value!r}")
+                parsed.append(None)
+            except TypeError:
+                # Missing value, already reported
+                parsed.append(None)
+        return parsed
+
+    def hs_codes(self) -> List[str]:
+        known = _known_hs_prefixes()
+        values = [
+            normalize_hs_code(value) if value is not None else None
+            for value in self.column("hs_code")
+        ]
+        for i, code in enumerate(values):
+            if code is None:
+                continue
+            if not code:
+                self.reject(i, "hs_code", "empty value")
+            elif not code.isdigit() or len(code) not in HS_LEVELS:
+                self.reject(i, "hs_code", f"not an HS code: {code!r}")
+            elif code[:6] not in known:
+                self.reject(i, "hs_code", f"unknown in ТН ВЭД: {code}")
+        return values
+
+    def years(self) -> List[Optional[int]]:
+        values = self.numbers("year", int)
+        max_year = datetime.now(timezone.utc).year + 1
+        for i, year in enumerate(values):
+            if year is not None and not _MIN_YEAR <= year <= max_year:
+                self.reject(i, "year", f"out of range {_MIN_YEAR}-{max_year}: {year}")
+        return values
+
+    def amounts(self, name: str) -> List[Optional[float]]:
+        values = self.numbers(name, float)
+        for i, value in enumerate(values):
+            # Also false for NaN
+            if value is not None and not 0 <= value < float("inf"):
+                self.reject(i, name, f"must be a finite non-negative number: {value}")
+        return values
+
+    def choices(self, name: str, allowed, label: str) -> List[Optional[str]]:
+        values = [
+            value.strip() if value is not None else None for value in self.column(name)
+        ]
+        for i, value in enumerate(values):
+            if value is not None and value not in allowed:
+                self.reject(i, name, f"unknown {label}: {value!r}")
+        return values
+
+    def countries(self, known, allow_unknown: bool) -> List[Optional[str]]:
+        """
+        Codes missing from countries.csv are rejected unless ``allow_unknown``;
+        then they are accepted and served as friendly countries, as in a
+        dataset replace, and only reported as a warning.
+        """
+        if not allow_unknown:
+            return self.choices("country", known, "country")
+        values = [
+            value.strip() if value is not None else None
+            for value in self.column("country")
+        ]
+        for i, value in enumerate(values):
+            if value is None:
+                continue
+            if not value:
+                self.reject(i, "country", "empty value")
+            elif value not in known:
+                self.unknown_countries[i] = value
+        return values
+
+    def non_empty(self, name: str) -> List[Optional[str]]:
+        values = self.column(name)
+        for i, value in enumerate(values):
+            if value is not None and not value.strip():
+                self.reject(i, name, "empty value")
+        return values
+
+    def duplicates(self, columns: Dict[str, list], seen: Dict[tuple, int]):
+        """``seen`` maps keys to record indexes across all chunks of the file."""
+        key_columns = [columns[name] for name in _TABLE_KEYS[self.table]]
+        for i, key in enumerate(zip(*key_columns)):
+            if i in self.errors:
+                continue
+            first = seen.setdefault(key, self.offset + i)
+            if first != self.offset + i:
+                self.reject(i, None, f"duplicate key of line {first + 2}")
+
+
+def _validate_columns(
+    validator: _Validator, seen: Dict[tuple, int], allow_unknown_countries: bool
+) -> Dict[str, list]:
+    table = validator.table
+    columns: Dict[str, list] = {"hs_code": validator.hs_codes()}
+    if table == "import_by_country":
+        known_countries = {
+            country.code for country in get_source_data().countries if country.code
+        }
+        columns["country"] = validator.countries(
+            known_countries, allow_unknown_countries
+        )
+        columns["year"] = validator.years()
+        columns["volume"] = validator.amounts("volume")
+        columns["quantity"] = validator.amounts("quantity")
+    elif table == "volumes_general":
+        columns["type"] = validator.choices("type", VOLUME_TYPES, "volume type")
+        columns["year"] = validator.years()
+        columns["volume"] = validator.amounts("volume")
+    else:
+        columns["key"] = validator.non_empty("key")
+        columns["value"] = [
+            parse_restriction_value(value) if value is not None else None
+            for value in validator.column("value")
+        ]
+    validator.duplicates(columns, seen)
+    return columns
+
+
+def import_batch(
+    table: str,
+    content: str,
+    progress: Optional[JobProgress] = None,
+    allow_unknown_countries: bool = False,
+) -> BatchImportReport:
+    """
+    Validate an uploaded CSV for ``table`` and apply its valid rows in one
+    write batch. Invalid rows are skipped and reported with their line.
+    Country codes missing from countries.csv are rejected unless
+    ``allow_unknown_countries``, in which case they are listed as a warning.
+    """
+    reader = csv.reader(io.StringIO(content))
+    header = [name.strip() for name in next(reader, [])]
+    missing = [column for column in TABLE_COLUMNS[table] if column not in header]
+    if missing:
+        raise MissingColumnsError(f"Missing columns: {', '.join(missing)}")
+    # One record per line is assumed for line numbers in the report
+    records = list(reader)
+    if progress is not None:
+        progress.start_stage("validating", len(records))
+
+    row_type = _ROW_TYPES[table]
+    items = []
+    # Record index in the file -> errors
+    row_errors: Dict[int, List[Tuple[Optional[str], str]]] = {}
+    blank = 0
+    unknown_countries = set()
+    seen: Dict[tuple, int] = {}
+    for offset in range(0, len(records), _CHUNK_ROWS):
+        chunk = records[offset : offset + _CHUNK_ROWS]
+        validator = _Validator(table, chunk, header, offset)
+        columns = _validate_columns(validator, seen, allow_unknown_countries)
+        # Columns are collected in the field order of the row class
+        skipped = validator.blank.union(validator.errors)
+        items.extend(
+            row_type(*values)
+            for i, values in enumerate(zip(*columns.values()))
+            if i not in skipped
+        )
+        for i, messages in validator.errors.items():
+            row_errors[offset + i] = messages
+        blank += len(validator.blank)
+        unknown_countries.update(
+            code for i, code in validator.unknown_countries.items() if i not in skipped
+        )
+        if progress is not None:
+            progress.advance(len(chunk))
+
+    if progress is not None:
+        progress.start_stage("applying", len(items))
+    inserted, updated = upsert_rows(table, items, progress)
+
+    errors: List[BatchRowError] = []
+    error_counts: Dict[str, int] = {}
+    for i in sorted(row_errors):
+        for column, message in row_errors[i]:
+            error_counts[column or "row"] = error_counts.get(column or "row", 0) + 1
+            if len(errors) < _MAX_ERRORS:
+                errors.append(BatchRowError(line=i + 2, column=column, message=message))
+    rejected = len(row_errors)
+    return BatchImportReport(
+        message=(
+            "Batch import completed successfully"
+            if not rejected
+            else f"Batch import completed, {rejected} rows rejected"
+        ),
+        table=table,
+        rows=len(records) - blank,
+        inserted=inserted,
+        updated=updated,
+        rejected=rejected,
+        error_counts=error_counts,
+        errors=errors,
+        errors_truncated=sum(error_counts.values()) > len(errors),
+        warnings=(
+            [f"Unknown country codes: {', '.join(sorted(unknown_countries))}"]
+            if unknown_countries
+            else []
+        ),
+    )
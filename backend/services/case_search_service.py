@@ -0,0 +1,217 @@
+import bisect
+import json
+import math
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from schemas.case_search_schemas import CaseSearchHit
+from services.metrics_service import record_cache
+
+HISTORICAL_CASES_FILE = Path("./data/historical_similarities.json")
+
+KIND_THESIS = "thesis"
+KIND_PRODUCT = "product"
+KIND_MEASURE = "measure"
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+_SNIPPET_CHARS = 160
+
+_TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+
+_STOP_WORDS = frozenset(
+    "а в во да для до же за и из или к как ли на не но о об от по при с со то у".split()
+)
+
+# Longest first; stripped once, keeping a stem of at least three letters
+_ENDINGS = sorted(
+    """
+    иями ями ами ией иям ием иях ость ости ение ения ении ений ание ания
+    ыми ими ого его ому ему ой ей ий ый ая яя ое ее ые ие ую юю ом ем их ых
+    ов ев ам ям ах ях ию ия ии ье ья ью ть ся а я о е и ы у ю й ь
+    """.split(),
+    key=len,
+    reverse=True,
+)
+
+_lock = threading.Lock()
+
+
+def _stem(token: str) -> str:
+    if token.isdigit() or not token.isalpha():
+        return token
+    for ending in _ENDINGS:
+        if token.endswith(ending) and len(token) - len(ending) >= 3:
+            return token[: -len(ending)]
+    return token
+
+
+def _tokens(text: str) -> List[Tuple[str, int, int]]:
+    """Stemmed terms of ``text`` with their character spans; stop words dropped."""
+    result = []
+    for match in _TOKEN_RE.finditer(text.lower().replace("ё", "е")):
+        token = match.group()
+        if token in _STOP_WORDS:
+            continue
+        result.append((_stem(token), match.start(), match.end()))
+    return result
+
+
+@dataclass
+class _Document:
+    kind: str
+    ref: Optional[str]
+    title: str
+    text: str
+    # (term, start, end) for snippets
+    tokens: List[Tuple[str, int, int]]
+
+
+class CaseSearchIndex:
+    """
+    Inverted index with BM25 ranking over historical case theses, products
+    (name plus product thesis) and measures (title plus affected products).
+    """
+
+    def __init__(self, data: dict):
+        self.documents: List[_Document] = []
+        # term -> [(document index, term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for thesis in data.get("theses", []):
+            self._add(KIND_THESIS, None, thesis, thesis)
+        product_theses = data.get("product_theses", [])
+        for i, product in enumerate(data.get("products", [])):
+            text = product["name"]
+            # product_theses follow the order of products
+            if i < len(product_theses) and product_theses[i].startswith(text):
+                text = product_theses[i]
+            self._add(KIND_PRODUCT, product["id"], product["name"], text)
+        measure_products = data.get("measure_theses", {})
+        for measure in data.get("measures", []):
+            products = measure_products.get(measure.get("slug"), [])
+            text = measure["title"]
+            if products:
+                text = f"{text}: {', '.join(products)}"
+            self._add(KIND_MEASURE, str(measure["id"]), measure["title"], text)
+
+        self.terms = sorted(self.postings)
+        lengths = [len(document.tokens) for document in self.documents]
+        self.average_length = sum(lengths) / len(lengths) if lengths else 0.0
+        total = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def _add(self, kind: str, ref: Optional[str], title: str, text: str):
+        tokens = _tokens(text)
+        index = len(self.documents)
+        self.documents.append(_Document(kind, ref, title, text, tokens))
+        frequencies: Dict[str, int] = {}
+        for term, _start, _end in tokens:
+            frequencies[term] = frequencies.get(term, 0) + 1
+        for term, frequency in frequencies.items():
+            self.postings.setdefault(term, []).append((index, frequency))
+
+    def _expand(self, term: str) -> List[str]:
+        # Numeric terms match as prefixes so "8428" finds "842810"
+        if not term.isdigit():
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.terms, term)
+        end = bisect.bisect_left(self.terms, term + "\uffff", start)
+        return self.terms[start:end]
+
+    def search(
+        self, query: str, kind: Optional[str] = None, limit: int = 10
+    ) -> Tuple[int, List[CaseSearchHit]]:
+        query_terms = {term for term, _start, _end in _tokens(query)}
+        matched_terms = {
+            term for query_term in query_terms for term in self._expand(query_term)
+        }
+        scores: Dict[int, float] = {}
+        for term in matched_terms:
+            idf = self.idf[term]
+            for index, frequency in self.postings[term]:
+                document = self.documents[index]
+                if kind is not None and document.kind != kind:
+                    continue
+                norm = 1 - _B + _B * len(document.tokens) / self.average_length
+                scores[index] = scores.get(index, 0.0) + idf * frequency * (_K1 + 1) / (
+                    frequency + _K1 * norm
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        hits = []
+        for index, score in ranked[:limit]:
+            document = self.documents[index]
+            snippet, highlights = _snippet(document, matched_terms)
+            hits.append(
+                CaseSearchHit(
+                    kind=document.kind,
+                    ref=document.ref,
+                    title=document.title,
+                    snippet=snippet,
+                    highlights=highlights,
+                    score=round(score, 4),
+                )
+            )
+        return len(scores), hits
+
+
+def _snippet(document: _Document, terms: set) -> Tuple[str, List[Tuple[int, int]]]:
+    """Window of the text around the first matched term, with match offsets."""
+    text = document.text
+    spans = [(start, end) for term, start, end in document.tokens if term in terms]
+    if len(text) <= _SNIPPET_CHARS:
+        return text, spans
+
+    first = spans[0][0] if spans else 0
+    start = max(0, min(first - _SNIPPET_CHARS // 4, len(text) - _SNIPPET_CHARS))
+    if start > 0:
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < first else start
+    end = start + _SNIPPET_CHARS
+    if end < len(text):
+        space = text.rfind(" ", start, end)
+        end = space if space > start else end
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    shift = len(prefix) - start
+    highlights = [(s + shift, e + shift) for s, e in spans if s >= start and e <= end]
+    return prefix + text[start:end] + suffix, highlights
+
+
+# name -> (file mtime, index)
+_indexes: Dict[str, Tuple[float, object]] = {}
+
+
+def get_historical_index(name: str, build: Callable[[dict], object]):
+    """
+    Index built by ``build`` from ``historical_similarities.json``, kept until
+    the file changes.
+    """
+    mtime = HISTORICAL_CASES_FILE.stat().st_mtime
+    with _lock:
+        cached = _indexes.get(name)
+        record_cache(name, cached is not None and cached[0] == mtime)
+        if cached is None or cached[0] != mtime:
+            with open(HISTORICAL_CASES_FILE, "r", encoding="utf-8") as file:
+                cached = _indexes[name] = (mtime, build(json.load(file)))
+        return cached[1]
+
+
+def get_case_search_index() -> CaseSearchIndex:
+    return get_historical_index("case_search", CaseSearchIndex)
+
+
+def search_cases(
+    query: str, kind: Optional[str] = None, limit: int = 10
+) -> Tuple[int, List[CaseSearchHit]]:
+    return get_case_search_index().search(query, kind=kind, limit=limit)
@@ -0,0 +1,128 @@
+import threading
+from typing import Dict, List, Optional
+
+from models.source import (
+    COUNTRY_CODES,
+    HS_CODES,
+    CountryInfoRow,
+    ImportByCountryRow,
+    RestrictionRow,
+    SourceData,
+    VolumeGeneralRow,
+)
+from services.metrics_service import record_cache
+from services.source_service import (
+    add_change_listener,
+    add_dataset_warmer,
+    get_source_data,
+    hold_writers,
+    register_index_tables,
+)
+
+_INDEX_NAME = "code_index"
+
+_TABLES = ("import_by_country", "volumes_general", "restrictions")
+
+_lock = threading.Lock()
+
+
+class CodeIndex:
+    """
+    Source rows grouped by hs_code id, in table order, and countries by id.
+
+    Per-code lookups replace the full-table scans reports used to do for
+    every request.
+    """
+
+    def __init__(self, source: SourceData):
+        # table -> hs_id -> rows
+        self.rows: Dict[str, Dict[int, list]] = {table: {} for table in _TABLES}
+        for table in _TABLES:
+            buckets = self.rows[table]
+            for item in getattr(source, table):
+                bucket = buckets.get(item.hs_id)
+                if bucket is None:
+                    bucket = buckets[item.hs_id] = []
+                bucket.append(item)
+        # Later rows win, as in {c.code: c for c in countries}
+        self.countries: Dict[int, CountryInfoRow] = {
+            country.country_id: country for country in source.countries
+        }
+
+    def apply(self, table: str, old, new):
+        buckets = self.rows[table]
+        if old is not None:
+            bucket = buckets.get(old.hs_id, [])
+            position = next((i for i, item in enumerate(bucket) if item is old), None)
+            if position is not None:
+                if new is not None and new.hs_id == old.hs_id:
+                    # In-place replacement keeps the table order
+                    bucket[position] = new
+                    return
+                del bucket[position]
+                if not bucket:
+                    del buckets[old.hs_id]
+        if new is not None:
+            buckets.setdefault(new.hs_id, []).append(new)
+
+    def _rows_for(self, table: str, hs_code: str) -> list:
+        hs_id = HS_CODES.lookup(hs_code)
+        if hs_id is None:
+            return []
+        return list(self.rows[table].get(hs_id, ()))
+
+    def imports_for(self, hs_code: str) -> List[ImportByCountryRow]:
+        return self._rows_for("import_by_country", hs_code)
+
+    def volumes_for(self, hs_code: str) -> List[VolumeGeneralRow]:
+        return self._rows_for("volumes_general", hs_code)
+
+    def restrictions_for(self, hs_code: str) -> List[RestrictionRow]:
+        return self._rows_for("restrictions", hs_code)
+
+    def import_row_counts(self) -> Dict[int, int]:
+        """Import rows per hs_code id, to size a scan before running it."""
+        return {
+            hs_id: len(rows) for hs_id, rows in self.rows["import_by_country"].items()
+        }
+
+    def imports_for_id(self, hs_id: int) -> List[ImportByCountryRow]:
+        return list(self.rows["import_by_country"].get(hs_id, ()))
+
+    def imports_by_code(self) -> Dict[str, List[ImportByCountryRow]]:
+        return {
+            HS_CODES.code(hs_id): list(rows)
+            for hs_id, rows in self.rows["import_by_country"].items()
+        }
+
+    def country(self, country_id: int) -> Optional[CountryInfoRow]:
+        return self.countries.get(country_id)
+
+    def country_by_code(self, code: str) -> Optional[CountryInfoRow]:
+        country_id = COUNTRY_CODES.lookup(code)
+        return None if country_id is None else self.countries.get(country_id)
+
+
+def get_code_index(source: Optional[SourceData] = None) -> CodeIndex:
+    source = source or get_source_data()
+    index = source.peek_index(_INDEX_NAME)
+    record_cache(_INDEX_NAME, index is not None)
+    if index is not None:
+        return index
+    # A row written during the build would also be applied by _on_source_change
+    with hold_writers(), _lock:
+        return source.get_index(_INDEX_NAME, CodeIndex)
+
+
+def _on_source_change(table: str, old, new):
+    if table not in _TABLES:
+        return
+    with _lock:
+        index = get_source_data().peek_index(_INDEX_NAME)
+        if index is not None:
+            index.apply(table, old, new)
+
+
+add_change_listener(_on_source_change)
+register_index_tables(_INDEX_NAME, ("countries",) + _TABLES)
+add_dataset_warmer(lambda source: source.get_index(_INDEX_NAME, CodeIndex))
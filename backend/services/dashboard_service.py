@@ -1,7 +1,17 @@
+import json
+import threading
+import weakref
 from collections import defaultdict
-from typing import Dict, List
-from services.source_service import get_source_data
-from models.source import VolumeGeneral
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from services.source_service import (
+    add_change_listener,
+    get_dataset_version,
+    get_source_data,
+)
+from models.source import CountryInfoRow, ImportByCountryRow, VolumeGeneralRow
 from schemas.dashboard_schemas import TnvedItem
 from config import settings
 from models.dashboard import (
@@ -13,87 +23,186 @@ from models.dashboard import (
     MetricHistoryItem,
     ImportStructureItem,
     ContractPriceItem,
+    RegionShareItem,
+    FriendlinessShareItem,
 )
 from models.dashboard import Recommendation, CaseStudy, ImpactMeasure
 from services.recommendation_service import RecommendationService, Measure
+from services.metrics_service import gauge, observe_stage, record_cache
+from services.region_service import get_region_index
+from services.code_index_service import get_code_index
+from services.rollup_service import get_rollup_cube, hs_prefixes, normalize_hs_code
+from services.similar_case_service import find_similar_cases
+from services.tracing_service import span
 import csv
 from pathlib import Path
 
 
-_GLOBAL_MAX_ID = 0
+REPORT_KIND_EXACT = "exact"
+REPORT_KIND_ROLLUP = "rollup"
 
-_GLOBAL_STORAGE: Dict[int, DashboardData] = {}
+# Analytical sections of DashboardData, selectable with ``fields``
+DASHBOARD_SECTIONS = (
+    "tariffs",
+    "metrics",
+    "geography",
+    "prices",
+    "recommendations",
+    "regions",
+    "friendliness",
+)
+# Always part of a dashboard response
+_IDENTITY_FIELDS = ("product", "organization", "share_url")
 
 
-def create_report(
-    product: ProductInfo, organization: OrganizationInfo
-) -> DashboardData:
-    global _GLOBAL_MAX_ID
+class SectionsUnavailableError(Exception):
+    pass
 
-    hs_code = product.code
 
-    source = get_source_data()
+@dataclass(eq=False)
+class ReportSections:
+    """
+    Analytical sections of a dashboard, shared by every stored report of the
+    same code built from the same data. Sections are built when first asked
+    for, and only while the data is still the one ``key`` was taken from;
+    built sections never change afterwards.
+    """
 
-    country_by_code = {c.code: c for c in source.countries}
+    # (kind, code, dataset version, code revision) the sections were built at
+    key: tuple
+    # Replaced, never updated in place, so readers need no lock
+    sections: Dict[str, Any]
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
-    # 3. Extract tariffs from restrictions
-    current_duty = 0.0
-    wto_duty = 0.0
-    for r in source.restrictions:
-        if r.hs_code != hs_code:
-            continue
-        try:
-            if r.key == "customs_duty_rate":
-                current_duty = float(r.value) if r.value is not None else 0.0
-            elif r.key == "customs_duty_rate_wto":
-                wto_duty = float(r.value) if r.value is not None else 0.0
-        except (TypeError, ValueError):
-            # If value is not convertible to float, ignore (keep default 0.0)
-            pass
+    @property
+    def dataset_version(self) -> int:
+        return self.key[2]
 
-    tariffs = TariffInfo(current=current_duty, wto_obligation=wto_duty)
 
-    # 4. Metrics
-    vol_by_type: Dict[str, List[VolumeGeneral]] = defaultdict(list)
-    for v in source.volumes_general:
-        if v.hs_code == hs_code:
-            vol_by_type[v.type].append(v)
-
-    def build_metric_history(items: List[VolumeGeneral]) -> List[MetricHistoryItem]:
-        sorted_items = sorted(items, key=lambda x: x.year)
-        history = []
-        for i, item in enumerate(sorted_items):
-            # Multiply by 10^6 and round to int
-            value = int(round(item.volume * 1e6))
-            if i == 0:
-                change_percent = 0.0
+@dataclass
+class StoredReport:
+    """
+    What a stored dashboard was made for, plus a reference to its sections;
+    the full ``DashboardData`` is rebuilt on access.
+    """
+
+    uid: int
+    kind: str
+    # hs_code for exact reports, HS prefix for rollups
+    code: str
+    product: ProductInfo
+    organization: OrganizationInfo
+    body: ReportSections
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    @property
+    def dataset_version(self) -> int:
+        return self.body.dataset_version
+
+    @property
+    def data(self) -> DashboardData:
+        return self.project(DASHBOARD_SECTIONS)
+
+    def project(
+        self, fields: Sequence[str], body: Optional[ReportSections] = None
+    ) -> DashboardData:
+        """
+        Dashboard with only ``fields`` among the analytical sections set,
+        taken from ``body`` if given instead of the stored sections. Raises
+        ``SectionsUnavailableError`` for sections that were not built and
+        can no longer be built from the same data.
+        """
+        body = body or self.body
+        _complete_sections(body, self.kind, self.code, fields)
+        sections = body.sections
+        # Sections were validated when they were built
+        return DashboardData.model_construct(
+            share_url=generate_share_url(self.uid),
+            product=self.product,
+            organization=self.organization,
+            **{name: sections[name] for name in fields},
+        )
+
+    def built_sections(self) -> Tuple[str, ...]:
+        """Analytical sections available without building anything."""
+        sections = self.body.sections
+        return tuple(name for name in DASHBOARD_SECTIONS if name in sections)
+
+
+_GLOBAL_MAX_ID = 0
+
+_GLOBAL_STORAGE: Dict[int, StoredReport] = {}
+
+_sections_lock = threading.Lock()
+# (kind, code, dataset version, code revision) -> sections; an entry goes
+# away with the last stored report referring to it
+_SHARED_SECTIONS: "weakref.WeakValueDictionary[tuple, ReportSections]" = (
+    weakref.WeakValueDictionary()
+)
+# HS code or prefix -> number of source row changes at or below it
+_code_revisions: Dict[str, int] = {}
+
+REPORTS_STORED = gauge(
+    "dashboard_reports_stored", "Dashboards held in the report store"
+)
+REPORTS_STORED.set_callback(lambda: {(): len(_GLOBAL_STORAGE)})
+REPORT_BODIES_SHARED = gauge(
+    "dashboard_report_bodies_shared",
+    "Distinct analytical sections referenced by stored dashboards",
+)
+REPORT_BODIES_SHARED.set_callback(lambda: {(): len(_SHARED_SECTIONS)})
+
+
+@contextmanager
+def _stage(name: str, hs_code: str):
+    with span(f"create_report.{name}", hs_code=hs_code), observe_stage(name):
+        yield
+
+
+def _build_metric_history(items: List[VolumeGeneralRow]) -> List[MetricHistoryItem]:
+    sorted_items = sorted(items, key=lambda x: x.year)
+    history = []
+    for i, item in enumerate(sorted_items):
+        # Multiply by 10^6 and round to int
+        value = int(round(item.volume * 1e6))
+        if i == 0:
+            change_percent = 0.0
+        else:
+            prev_value = int(round(sorted_items[i - 1].volume * 1e6))
+            if prev_value == 0:
+                change_percent = 0.0 if value == 0 else float("inf")
             else:
-                prev_value = int(round(sorted_items[i - 1].volume * 1e6))
-                if prev_value == 0:
-                    change_percent = 0.0 if value == 0 else float("inf")
-                else:
-                    change_percent = ((value - prev_value) / prev_value) * 100
-                # Cap inf to a large number or keep as 0? We'll keep inf as float('inf')
-                # But Pydantic may not accept inf; better to use 0.0 or large placeholder.
-                if not (-1e10 < change_percent < 1e10):  # avoid inf/nan
-                    change_percent = 0.0
-            history.append(
-                MetricHistoryItem(
-                    year=item.year, value=value, change_percent=round(change_percent, 2)
-                )
+                change_percent = ((value - prev_value) / prev_value) * 100
+            # Cap inf to a large number or keep as 0? We'll keep inf as float('inf')
+            # But Pydantic may not accept inf; better to use 0.0 or large placeholder.
+            if not (-1e10 < change_percent < 1e10):  # avoid inf/nan
+                change_percent = 0.0
+        history.append(
+            MetricHistoryItem(
+                year=item.year, value=value, change_percent=round(change_percent, 2)
             )
-        return history
+        )
+    return history
+
+
+def _build_metrics(volumes: List[VolumeGeneralRow]) -> Metrics:
+    vol_by_type: Dict[str, List[VolumeGeneralRow]] = defaultdict(list)
+    for v in volumes:
+        vol_by_type[v.type].append(v)
 
-    metrics = Metrics(
-        import_data=build_metric_history(vol_by_type.get("import", [])),
-        production=build_metric_history(vol_by_type.get("production", [])),
-        consumption=build_metric_history(vol_by_type.get("consumption", [])),
+    return Metrics(
+        import_data=_build_metric_history(vol_by_type.get("import", [])),
+        production=_build_metric_history(vol_by_type.get("production", [])),
+        consumption=_build_metric_history(vol_by_type.get("consumption", [])),
     )
 
-    # 5. Geography: latest year only
-    imports = [imp for imp in source.import_by_country if imp.hs_code == hs_code]
+
+def _build_geography_and_prices(
+    imports: List[ImportByCountryRow], countries: Dict[int, CountryInfoRow]
+) -> Tuple[List[ImportStructureItem], List[ContractPriceItem]]:
+    # Geography: latest year only
     geography = []
-    prices = []  # <-- initialize here or below
+    prices = []
     if imports:
         latest_year = max(imp.year for imp in imports)
         latest_imports = [imp for imp in imports if imp.year == latest_year]
@@ -101,7 +210,7 @@ def create_report(
         # Geography: shares
         if total_vol > 0:
             for imp in latest_imports:
-                country_info = country_by_code.get(imp.country)
+                country_info = countries.get(imp.country_id)
                 country_name = country_info.name if country_info else f"[{imp.country}]"
                 geography.append(
                     ImportStructureItem(
@@ -112,7 +221,7 @@ def create_report(
                 )
         # Prices: absolute values (assuming volume = price in millions USD)
         for imp in latest_imports:
-            country_info = country_by_code.get(imp.country)
+            country_info = countries.get(imp.country_id)
             country_name = country_info.name if country_info else f"[{imp.country}]"
             price_usd = int(round(imp.volume * 1e6))
             prices.append(
@@ -123,11 +232,83 @@ def create_report(
                     quantity=imp.quantity,
                 )
             )
+    return geography, prices
 
-    recommendation_service = RecommendationService(source)
-    recommended_measures, recommended_reasons = recommendation_service.recommend(
-        hs_code
-    )
+
+def create_report(
+    product: ProductInfo,
+    organization: OrganizationInfo,
+    fields: Sequence[str] = DASHBOARD_SECTIONS,
+) -> StoredReport:
+    """Store a dashboard for ``product``, building only the sections in ``fields``."""
+    hs_code = product.code
+    body = get_report_sections(REPORT_KIND_EXACT, hs_code, fields)
+
+    with span("report.store", hs_code=hs_code):
+        return _store_report(REPORT_KIND_EXACT, hs_code, product, organization, body)
+
+
+def build_report_sections(
+    hs_code: str, fields: Iterable[str] = DASHBOARD_SECTIONS
+) -> Dict[str, Any]:
+    """Analytical sections of the dashboard for an exact hs_code, only ``fields``."""
+    fields = set(fields)
+    sections: Dict[str, Any] = {}
+    with span("source.snapshot", hs_code=hs_code):
+        source = get_source_data()
+        code_index = get_code_index(source)
+
+    # 3. Extract tariffs from restrictions
+    if "tariffs" in fields:
+        with _stage("tariffs", hs_code):
+            current_duty = 0.0
+            wto_duty = 0.0
+            for r in code_index.restrictions_for(hs_code):
+                try:
+                    if r.key == "customs_duty_rate":
+                        current_duty = float(r.value) if r.value is not None else 0.0
+                    elif r.key == "customs_duty_rate_wto":
+                        wto_duty = float(r.value) if r.value is not None else 0.0
+                except (TypeError, ValueError):
+                    # If value is not convertible to float, ignore (keep default 0.0)
+                    pass
+
+        sections["tariffs"] = TariffInfo(current=current_duty, wto_obligation=wto_duty)
+
+    # 4. Metrics
+    if "metrics" in fields:
+        with _stage("metric_history", hs_code):
+            sections["metrics"] = _build_metrics(code_index.volumes_for(hs_code))
+
+    # 5. Geography and prices
+    if fields & {"geography", "prices"}:
+        with _stage("geography_prices", hs_code):
+            imports = code_index.imports_for(hs_code)
+            sections["geography"], sections["prices"] = _build_geography_and_prices(
+                imports, code_index.countries
+            )
+
+    if fields & {"regions", "friendliness"}:
+        with _stage("regions", hs_code):
+            region_index = get_region_index(source)
+            sections["regions"] = region_index.region_shares(hs_code)
+            sections["friendliness"] = region_index.friendliness_shares(hs_code)
+
+    if "recommendations" in fields:
+        sections["recommendations"] = _build_recommendations(source, hs_code)
+
+    return sections
+
+
+def _build_recommendations(source, hs_code: str) -> List[Recommendation]:
+    with _stage("recommendations", hs_code):
+        recommendation_service = RecommendationService(source)
+        analysis_input, recommended_measures, recommended_reasons = (
+            recommendation_service.recommend_with_input(hs_code)
+        )
+
+    with _stage("similar_cases", hs_code):
+        similar_cases = find_similar_cases(analysis_input, recommended_measures)
 
     recommendations: List[Recommendation] = []
     for code in recommended_measures:
@@ -136,33 +317,166 @@ def create_report(
             name = measure.description
         except ValueError:
             name = f"Мера поддержки {code}"
+        # Validation would copy the list; every measure shares the same reasons
         recommendations.append(
-            Recommendation(
+            Recommendation.model_construct(
                 name=name,
                 reasons=recommended_reasons,
-                similar_cases=[],
+                similar_cases=similar_cases.get(code, []),
             )
         )
+    return recommendations
+
+
+def create_rollup_report(
+    product: ProductInfo,
+    organization: OrganizationInfo,
+    fields: Sequence[str] = DASHBOARD_SECTIONS,
+) -> StoredReport:
+    """
+    Dashboard for an HS chapter or heading (any prefix of ``HS_LEVELS``),
+    read from the rollup cube instead of scanning source rows.
+
+    Tariffs and measures are defined per tariff line, so a rollup dashboard
+    carries zero tariffs and no recommendations.
+    """
+    prefix = normalize_hs_code(product.code)
+    body = get_report_sections(REPORT_KIND_ROLLUP, prefix, fields)
+
+    with span("report.store", hs_code=prefix):
+        return _store_report(REPORT_KIND_ROLLUP, prefix, product, organization, body)
+
+
+def build_rollup_sections(
+    prefix: str, fields: Iterable[str] = DASHBOARD_SECTIONS
+) -> Dict[str, Any]:
+    fields = set(fields)
+    sections: Dict[str, Any] = {
+        "tariffs": TariffInfo(current=0.0, wto_obligation=0.0),
+        "recommendations": [],
+    }
+    with span("source.snapshot", hs_code=prefix):
+        source = get_source_data()
+        cube = get_rollup_cube(source)
+        code_index = get_code_index(source)
+
+    if "metrics" in fields:
+        with _stage("metric_history", prefix):
+            sections["metrics"] = _build_metrics(cube.volume_rows(prefix))
+
+    if fields & {"geography", "prices"}:
+        with _stage("geography_prices", prefix):
+            sections["geography"], sections["prices"] = _build_geography_and_prices(
+                cube.import_rows(prefix), code_index.countries
+            )
+
+    if fields & {"regions", "friendliness"}:
+        with _stage("regions", prefix):
+            region_index = get_region_index(source)
+            sections["regions"] = region_index.region_shares(prefix)
+            sections["friendliness"] = region_index.friendliness_shares(prefix)
+
+    return sections
+
+
+def build_sections(
+    kind: str, code: str, fields: Iterable[str] = DASHBOARD_SECTIONS
+) -> Dict[str, Any]:
+    if kind == REPORT_KIND_ROLLUP:
+        return build_rollup_sections(code, fields)
+    return build_report_sections(code, fields)
+
+
+def _complete_sections(
+    body: ReportSections, kind: str, code: str, fields: Iterable[str]
+):
+    """
+    Build the sections in ``fields`` that ``body`` does not have yet, as long
+    as neither the dataset nor the rows under ``code`` changed since ``body``
+    was built; mixing sections of different data is refused.
+    """
+    if all(name in body.sections for name in fields):
+        return
+    with body.lock:
+        missing = [name for name in fields if name not in body.sections]
+        if not missing:
+            return
+        if _sections_key(kind, code) == body.key:
+            sections = build_sections(kind, code, missing)
+            # Checked again: rows may have changed while building
+            if _sections_key(kind, code) == body.key:
+                body.sections = {**body.sections, **sections}
+                return
+        raise SectionsUnavailableError(
+            f"Sections {', '.join(missing)} were not built when the dashboard "
+            "was created and its data has changed since"
+        )
 
-    _GLOBAL_MAX_ID += 1
 
-    # 7. Share URL
-    share_url = generate_share_url(_GLOBAL_MAX_ID)
+def _sections_key(kind: str, code: str) -> tuple:
+    with _sections_lock:
+        revision = _code_revisions.get(normalize_hs_code(code), 0)
+    return (kind, code, get_dataset_version(), revision)
 
-    data = DashboardData(
+
+def get_report_sections(
+    kind: str, code: str, fields: Sequence[str] = DASHBOARD_SECTIONS
+) -> ReportSections:
+    """
+    Sections for ``code`` as of the current data, reused when an earlier
+    report was built from the same dataset version and the same rows.
+    At least the sections in ``fields`` are built.
+    """
+    key = _sections_key(kind, code)
+    with _sections_lock:
+        body = _SHARED_SECTIONS.get(key)
+    record_cache("report_sections", body is not None)
+    if body is None:
+        body = ReportSections(key=key, sections=build_sections(kind, code, fields))
+        # Rows under the code changed while building: keep the result unshared
+        if _sections_key(kind, code) != key:
+            return body
+        with _sections_lock:
+            body = _SHARED_SECTIONS.setdefault(key, body)
+    _complete_sections(body, kind, code, fields)
+    return body
+
+
+def _on_source_change(table: str, old, new):
+    prefixes = set()
+    for row in (old, new):
+        if row is not None and hasattr(row, "hs_code"):
+            prefixes.update(hs_prefixes(row.hs_code))
+    with _sections_lock:
+        for prefix in prefixes:
+            _code_revisions[prefix] = _code_revisions.get(prefix, 0) + 1
+
+
+add_change_listener(_on_source_change)
+
+
+def _store_report(
+    kind: str,
+    code: str,
+    product: ProductInfo,
+    organization: OrganizationInfo,
+    body: ReportSections,
+) -> StoredReport:
+    global _GLOBAL_MAX_ID
+
+    _GLOBAL_MAX_ID += 1
+
+    stored = StoredReport(
+        uid=_GLOBAL_MAX_ID,
+        kind=kind,
+        code=code,
         product=product,
         organization=organization,
-        tariffs=tariffs,
-        metrics=metrics,
-        geography=geography,
-        prices=prices,
-        recommendations=recommendations,
-        share_url=share_url,
+        body=body,
     )
+    _GLOBAL_STORAGE[_GLOBAL_MAX_ID] = stored
 
-    _GLOBAL_STORAGE[_GLOBAL_MAX_ID] = data
-
-    return data
+    return stored
 
 
 def generate_share_url(uid: int):
@@ -170,11 +484,95 @@ def generate_share_url(uid: int):
 
 
 def retrieve_report(uid: int):
+    return get_stored_report(uid).data
+
+
+def report_json(
+    stored: StoredReport, fields: Sequence[str], compact: bool = False
+) -> bytes:
+    """
+    ``{"dashboard": ...}`` with the identity fields and only the analytical
+    sections in ``fields``. With ``compact``, reason lists are sent once in
+    ``reason_lists`` and recommendations refer to them by ``reasons_ref``.
+    """
+    data = stored.project(fields)
+    if not (compact and "recommendations" in fields):
+        dashboard = data.model_dump_json(include=set(_IDENTITY_FIELDS) | set(fields))
+        return b'{"dashboard":' + dashboard.encode() + b"}"
+
+    include = set(_IDENTITY_FIELDS) | set(fields)
+    include.discard("recommendations")
+    dashboard = data.model_dump(mode="json", include=include)
+    reason_lists: List[List[str]] = []
+    positions: Dict[Tuple[str, ...], int] = {}
+    recommendations: List[Dict[str, Any]] = []
+    for recommendation in data.recommendations:
+        # Usually the same list object, compared by content all the same
+        reasons = tuple(recommendation.reasons)
+        if reasons not in positions:
+            positions[reasons] = len(reason_lists)
+            reason_lists.append(recommendation.reasons)
+        item = recommendation.model_dump(mode="json", exclude={"reasons"})
+        item["reasons_ref"] = positions[reasons]
+        recommendations.append(item)
+    dashboard["recommendations"] = recommendations
+    dashboard["reason_lists"] = reason_lists
+    return json.dumps(
+        {"dashboard": dashboard}, ensure_ascii=False, separators=(",", ":")
+    ).encode()
+
+
+def get_stored_report(uid: int) -> StoredReport:
     if uid not in _GLOBAL_STORAGE:
         raise Exception("Document by ID Not found")
     return _GLOBAL_STORAGE[uid]
 
 
+def _first_id_created_at(since: datetime, low: int, high: int) -> int:
+    # Ids are handed out in creation order, so created_at grows with the id
+    while low < high:
+        middle = (low + high) // 2
+        stored = _GLOBAL_STORAGE.get(middle)
+        if stored is not None and stored.created_at < since:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def iter_stored_reports(
+    after_id: int = 0,
+    to_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[Tuple[int, StoredReport]]:
+    """
+    Stored reports in id order, looked up one at a time so the store is
+    neither copied nor locked. Ends at the last id stored when iteration began.
+    """
+    last_id = _GLOBAL_MAX_ID if to_id is None else min(to_id, _GLOBAL_MAX_ID)
+    uid = max(after_id, 0) + 1
+    if since is not None:
+        uid = _first_id_created_at(since, uid, last_id + 1)
+    while uid <= last_id:
+        stored = _GLOBAL_STORAGE.get(uid)
+        if stored is not None:
+            if until is not None and stored.created_at >= until:
+                return
+            yield uid, stored
+        uid += 1
+
+
+def get_region_breakdown(
+    hs_code: str,
+) -> Tuple[List[RegionShareItem], List[FriendlinessShareItem]]:
+    region_index = get_region_index()
+    return (
+        region_index.region_shares(hs_code),
+        region_index.friendliness_shares(hs_code),
+    )
+
+
 def get_tnved_list_service() -> List[TnvedItem]:
     tnved_file_path = Path("data/tnved.csv")
     items = []
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Set, Tuple
+
+from config import settings
+from schemas.dashboard_schemas import DashboardResponse
+from services.dashboard_service import (
+    DASHBOARD_SECTIONS,
+    SectionsUnavailableError,
+    get_report_sections,
+    get_stored_report,
+)
+from services.metrics_service import gauge
+from services.rollup_service import normalize_hs_code
+from services.source_service import change_bus
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+# Tell EventSource clients how long to wait before reconnecting
+_RETRY_MS = 3000
+
+
+class _Topic:
+    """
+    Open dashboards sharing one (kind, code): a single change-bus subscription
+    and a single recomputation per change, fanned out to every connection.
+    """
+
+    def __init__(self, kind: str, code: str):
+        self.kind = kind
+        self.code = code
+        # uid -> connection queues
+        self.connections: Dict[int, Set[asyncio.Queue]] = {}
+        # Changes are published with normalized codes
+        self.subscription = change_bus.subscribe(normalize_hs_code(code))
+        self.task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await self.subscription.wait()
+            # Let a burst of writes (CSV import, batch) settle into one update
+            await asyncio.sleep(settings.sse_debounce_seconds)
+            try:
+                body = await run_in_threadpool(
+                    get_report_sections, self.kind, self.code
+                )
+            except Exception:
+                logger.exception("Dashboard recompute failed for %s", self.code)
+                continue
+            # Only sent to the streams; stored reports keep the data they
+            # were created with
+            for uid, queues in list(self.connections.items()):
+                data = get_stored_report(uid).project(DASHBOARD_SECTIONS, body)
+                frame = _event("dashboard", DashboardResponse(dashboard=data))
+                for queue in queues:
+                    _put_latest(queue, frame)
+
+    def close(self):
+        self.task.cancel()
+        change_bus.unsubscribe(self.subscription)
+
+
+_topics: Dict[Tuple[str, str], _Topic] = {}
+
+
+def _event(name: str, payload: DashboardResponse) -> str:
+    return f"event: {name}\ndata: {payload.model_dump_json()}\n\n"
+
+
+def _put_latest(queue: asyncio.Queue, frame: str):
+    # Slow clients only ever need the newest dashboard
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(frame)
+
+
+def _connect(uid: int, kind: str, code: str) -> asyncio.Queue:
+    topic = _topics.get((kind, code))
+    if topic is None:
+        topic = _topics[(kind, code)] = _Topic(kind, code)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    topic.connections.setdefault(uid, set()).add(queue)
+    return queue
+
+
+def _disconnect(uid: int, kind: str, code: str, queue: asyncio.Queue):
+    topic = _topics.get((kind, code))
+    if topic is None:
+        return
+    queues = topic.connections.get(uid)
+    if queues is not None:
+        queues.discard(queue)
+        if not queues:
+            del topic.connections[uid]
+    if not topic.connections:
+        del _topics[(kind, code)]
+        topic.close()
+
+
+async def dashboard_events(uid: int) -> AsyncIterator[str]:
+    """
+    Server-Sent Events stream for a stored dashboard: the current version
+    first, then a recomputed one whenever a source row for its HS code changes.
+    """
+    stored = get_stored_report(uid)
+    queue = _connect(uid, stored.kind, stored.code)
+    try:
+        yield f"retry: {_RETRY_MS}\n\n"
+        try:
+            data = await run_in_threadpool(lambda: stored.data)
+        except SectionsUnavailableError:
+            # Created with ``fields`` and changed since: start from current data
+            body = await run_in_threadpool(
+                get_report_sections, stored.kind, stored.code
+            )
+            data = stored.project(DASHBOARD_SECTIONS, body)
+        yield _event("dashboard", DashboardResponse(dashboard=data))
+        while True:
+            try:
+                yield await asyncio.wait_for(
+                    queue.get(), timeout=settings.sse_keepalive_seconds
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+    finally:
+        _disconnect(uid, stored.kind, stored.code, queue)
+
+
+STREAM_CONNECTIONS = gauge(
+    "dashboard_stream_connections", "Open dashboard event streams"
+)
+STREAM_CONNECTIONS.set_callback(
+    lambda: {
+        (): sum(
+            len(queues)
+            for topic in list(_topics.values())
+            for queues in list(topic.connections.values())
+        )
+    }
+)
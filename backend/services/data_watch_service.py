@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from config import settings
+from services.metrics_service import counter, histogram
+from services.source_service import changed_source_tables, reload_source_tables
+
+logger = logging.getLogger(__name__)
+
+DATA_RELOADS = counter(
+    "data_reloads_total", "Hot reloads of source tables from data/", ["result"]
+)
+DATA_RELOAD_DURATION = histogram(
+    "data_reload_duration_seconds", "Time to reload changed tables and publish them"
+)
+
+
+class DataWatcher:
+    """
+    Polls the source CSVs in ``data/`` and hot-reloads tables whose files
+    changed.
+
+    A change is picked up once its mtime and size are the same on two polls
+    in a row, so a file that is still being copied into place is not read
+    half-written. A file that fails to load is retried only after it
+    changes again.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # table -> signature seen on the previous poll
+        self._pending: Dict[str, Tuple[int, int]] = {}
+        # table -> signature that failed to load
+        self._failed: Dict[str, Tuple[int, int]] = {}
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="data-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Data directory poll failed")
+
+    def poll(self):
+        changed = {
+            table: signature
+            for table, signature in changed_source_tables().items()
+            if self._failed.get(table) != signature
+        }
+        stable = [
+            table
+            for table, signature in changed.items()
+            if self._pending.get(table) == signature
+        ]
+        self._pending = changed
+        if not stable:
+            return
+
+        started = time.perf_counter()
+        try:
+            reload_source_tables(stable)
+        except Exception:
+            DATA_RELOADS.inc(result="failed")
+            logger.exception("Reloading %s failed", ", ".join(stable))
+            for table in stable:
+                self._failed[table] = changed[table]
+            return
+        DATA_RELOAD_DURATION.observe(time.perf_counter() - started)
+        DATA_RELOADS.inc(result="ok")
+        logger.info("Reloaded %s", ", ".join(stable))
+        for table in stable:
+            self._pending.pop(table, None)
+            self._failed.pop(table, None)
+
+
+_watcher: Optional[DataWatcher] = None
+
+
+def start_data_watcher():
+    global _watcher
+    if not settings.data_watch_enabled or _watcher is not None:
+        return
+    _watcher = DataWatcher(settings.data_watch_interval_seconds)
+    _watcher.start()
+
+
+def stop_data_watcher():
+    global _watcher
+    if _watcher is not None:
+        _watcher.stop()
+        _watcher = None
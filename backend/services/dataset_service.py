@@ -0,0 +1,165 @@
+import csv
+import io
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.source import SourceData
+from schemas.dataset_schemas import DatasetError, DatasetInfo, DatasetReplaceResult
+from services.job_service import JobFailedError, JobProgress
+from services.source_service import (
+    ROW_PARSERS,
+    TABLE_COLUMNS,
+    get_dataset_version,
+    get_source_data,
+    get_source_version,
+    has_previous_source_data,
+    publish_source_data,
+    warm_source_data,
+)
+
+VOLUME_TYPES = ("import", "production", "consumption")
+
+# Row key per table; two rows with the same key make a bundle invalid.
+# countries is not checked: aggregate rows ("Страны ЕС", ...) have no code
+_TABLE_KEYS = {
+    "import_by_country": ("hs_code", "country", "year"),
+    "volumes_general": ("hs_code", "type", "year"),
+    "restrictions": ("hs_code", "key"),
+}
+
+_MAX_ERRORS = 200
+
+# One replace at a time; later ones wait in the "waiting" stage
+_replace_lock = threading.Lock()
+
+
+class _ErrorCollector:
+    def __init__(self):
+        self.errors: List[DatasetError] = []
+
+    def add(self, table: str, message: str, line: Optional[int] = None):
+        if len(self.errors) < _MAX_ERRORS:
+            self.errors.append(DatasetError(table=table, line=line, message=message))
+
+    @property
+    def full(self) -> bool:
+        return len(self.errors) >= _MAX_ERRORS
+
+
+def _parse_table(table: str, content: bytes, errors: _ErrorCollector) -> Optional[list]:
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        errors.add(table, f"File is not valid UTF-8: {e}")
+        return None
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [
+        column
+        for column in TABLE_COLUMNS[table]
+        if column not in (reader.fieldnames or [])
+    ]
+    if missing:
+        errors.add(table, f"Missing columns: {', '.join(missing)}", line=1)
+        return None
+
+    parse = ROW_PARSERS[table]
+    key_fields = _TABLE_KEYS.get(table, ())
+    seen: Set[tuple] = set()
+    rows = []
+    for row in reader:
+        line = reader.line_num
+        try:
+            item = parse(row)
+        except (KeyError, TypeError, ValueError) as e:
+            errors.add(table, f"Invalid row: {e}", line=line)
+            if errors.full:
+                return None
+            continue
+        key = tuple(getattr(item, field) for field in key_fields)
+        if key_fields and key in seen:
+            errors.add(table, f"Duplicate row for {key}", line=line)
+            continue
+        seen.add(key)
+        rows.append(item)
+    return rows
+
+
+def _check_references(
+    source: SourceData, errors: _ErrorCollector, warnings: _ErrorCollector
+):
+    if not source.countries:
+        errors.add("countries", "Table is empty")
+    if not source.import_by_country:
+        errors.add("import_by_country", "Table is empty")
+    known_countries = {country.code for country in source.countries}
+    unknown = sorted(
+        {
+            item.country
+            for item in source.import_by_country
+            if item.country not in known_countries
+        }
+    )
+    if unknown:
+        # Served as friendly countries, like everywhere else in the analysis
+        warnings.add(
+            "import_by_country", f"Unknown country codes: {', '.join(unknown)}"
+        )
+    bad_types = sorted(
+        {item.type for item in source.volumes_general if item.type not in VOLUME_TYPES}
+    )
+    if bad_types:
+        errors.add("volumes_general", f"Unknown volume types: {', '.join(bad_types)}")
+
+
+def build_source_data(
+    files: Dict[str, bytes],
+) -> Tuple[SourceData, List[DatasetError], List[DatasetError]]:
+    """Parse and validate a full dataset bundle; errors make it unusable."""
+    errors = _ErrorCollector()
+    warnings = _ErrorCollector()
+    source = SourceData()
+    for table in TABLE_COLUMNS:
+        rows = _parse_table(table, files[table], errors)
+        if rows is not None:
+            setattr(source, table, rows)
+    if not errors.errors:
+        _check_references(source, errors, warnings)
+    return source, errors.errors, warnings.errors
+
+
+def _row_counts(source: SourceData) -> Dict[str, int]:
+    return {table: len(getattr(source, table)) for table in TABLE_COLUMNS}
+
+
+def run_dataset_replace(
+    files: Dict[str, bytes], progress: JobProgress
+) -> DatasetReplaceResult:
+    """
+    Work of a ``dataset_replace`` job: validate the bundle, build its indexes
+    and switch to it. Validation errors fail the job with them as its result.
+    """
+    progress.start_stage("waiting")
+    with _replace_lock:
+        progress.start_stage("validating")
+        source, errors, warnings = build_source_data(files)
+        if errors:
+            raise JobFailedError(
+                f"Dataset has {len(errors)} errors",
+                DatasetReplaceResult(errors=errors, warnings=warnings),
+            )
+        rows = _row_counts(source)
+        progress.start_stage("building_indexes")
+        warm_source_data(source)
+        publish_source_data(source)
+        return DatasetReplaceResult(
+            rows=rows, warnings=warnings, version=get_dataset_version()
+        )
+
+
+def get_dataset_info() -> DatasetInfo:
+    return DatasetInfo(
+        version=get_dataset_version(),
+        source_version=get_source_version(),
+        rows=_row_counts(get_source_data()),
+        rollback_available=has_previous_source_data(),
+    )
@@ -0,0 +1,62 @@
+import zlib
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from services.dashboard_service import iter_stored_reports
+
+# Compressed output is flushed to the client roughly every this many bytes
+_GZIP_CHUNK_BYTES = 64 * 1024
+
+
+def _as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    # Reports are stamped in UTC; naive bounds are taken to be UTC as well
+    if moment is not None and moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def _report_lines(**filters) -> Iterator[bytes]:
+    for uid, stored in iter_stored_reports(**filters):
+        # Only the sections built so far; exporting never builds any
+        sections = stored.built_sections()
+        dashboard = stored.project(sections).model_dump_json(
+            include={"product", "organization", "share_url", *sections}
+        )
+        # The dashboard is already JSON; splice it in instead of re-encoding
+        yield (
+            f'{{"id":{uid},"created_at":"{stored.created_at.isoformat()}",'
+            f'"kind":"{stored.kind}","dashboard":{dashboard}}}\n'
+        ).encode("utf-8")
+
+
+def _gzip(lines: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    pending = 0
+    for line in lines:
+        chunk = compressor.compress(line)
+        pending += len(line)
+        if pending >= _GZIP_CHUNK_BYTES:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def export_reports_ndjson(
+    after_id: int = 0,
+    to_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    compress: bool = False,
+) -> Iterator[bytes]:
+    """
+    Stored dashboards as NDJSON, one ``{"id", "created_at", "kind",
+    "dashboard"}`` object per line in id order; a dashboard created with
+    ``fields`` carries only the sections built for it. Resume an interrupted export
+    by passing the last received id as ``after_id``.
+    """
+    lines = _report_lines(
+        after_id=after_id, to_id=to_id, since=_as_utc(since), until=_as_utc(until)
+    )
+    return _gzip(lines) if compress else lines
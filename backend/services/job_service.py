@@ -0,0 +1,282 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+from pydantic import BaseModel
+
+from config import settings
+from schemas.job_schemas import (
+    JOB_FAILED,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_SUCCEEDED,
+    JobStatus,
+)
+from services.metrics_service import counter, gauge, histogram
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for polling; queued and running jobs are never dropped
+_HISTORY_SIZE = 100
+
+JOBS_FINISHED = counter(
+    "jobs_finished_total", "Background jobs finished", ["kind", "result"]
+)
+JOB_DURATION = histogram(
+    "job_duration_seconds", "Background job run time, queueing excluded", ["kind"]
+)
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobFailedError(Exception):
+    """A failure with details, e.g. validation errors, kept as the job result."""
+
+    def __init__(self, message: str, result: Any = None):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class JobFile:
+    """File produced by a job, served from ``/jobs/{id}/download``."""
+
+    content: bytes
+    filename: str
+    media_type: str
+
+
+@dataclass
+class StoredJobFile:
+    """A job's file spooled to disk until it expires or the job is evicted."""
+
+    path: Path
+    filename: str
+    media_type: str
+    expires_at: float
+
+    def remove(self):
+        self.path.unlink(missing_ok=True)
+
+
+class JobProgress:
+    """
+    Progress reported by a running job from its worker thread.
+
+    A job may go through several stages; rows and throughput are counted per
+    stage so the ETA covers the current one.
+    """
+
+    def __init__(self):
+        self.stage: Optional[str] = None
+        self.total: Optional[int] = None
+        self.processed = 0
+        self.stage_started: Optional[float] = None
+        self.stopped: Optional[float] = None
+
+    def start_stage(self, name: str, total: Optional[int] = None):
+        self.stage = name
+        self.total = total
+        self.processed = 0
+        self.stage_started = time.perf_counter()
+
+    def advance(self, count: int = 1):
+        self.processed += count
+
+    def stop(self):
+        self.stopped = time.perf_counter()
+
+    def rate(self) -> Optional[float]:
+        """Rows per second in the current stage, or the last one once stopped."""
+        if self.stage_started is None:
+            return None
+        elapsed = (self.stopped or time.perf_counter()) - self.stage_started
+        return self.processed / elapsed if elapsed > 0 else None
+
+    def eta(self, rate: Optional[float]) -> Optional[float]:
+        if self.total is None or not rate:
+            return None
+        return max(self.total - self.processed, 0) / rate
+
+
+JobWork = Callable[[JobProgress], Any]
+
+
+class _Job:
+    def __init__(self, kind: str, work: JobWork):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.work = work
+        self.status = JOB_QUEUED
+        self.submitted_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.progress = JobProgress()
+        self.result: Optional[dict] = None
+        self.file: Optional[StoredJobFile] = None
+        self.error: Optional[str] = None
+
+    def view(self) -> JobStatus:
+        progress = self.progress
+        running = self.status == JOB_RUNNING
+        rate = progress.rate()
+        return JobStatus(
+            id=self.id,
+            kind=self.kind,
+            status=self.status,
+            submitted_at=self.submitted_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            stage=progress.stage,
+            rows_total=progress.total,
+            rows_processed=progress.processed,
+            rows_per_second=round(rate, 1) if rate is not None else None,
+            eta_seconds=round(progress.eta(rate), 1) if running and rate else None,
+            result=self.result,
+            download_url=(
+                f"{settings.api_base_url}/api/v1/jobs/{self.id}/download"
+                if self.file is not None
+                else None
+            ),
+            error=self.error,
+        )
+
+
+def _result(outcome: Any) -> Optional[dict]:
+    if isinstance(outcome, BaseModel):
+        return outcome.model_dump(mode="json")
+    return outcome
+
+
+class JobQueue:
+    """
+    In-process queue for long-running data operations.
+
+    Jobs run on their own pool of ``workers`` threads, so bulk work never
+    occupies the request threadpool; at most ``max_pending`` jobs may wait.
+    Files produced by jobs are kept on disk, not in memory, for
+    ``file_ttl`` seconds.
+    """
+
+    def __init__(self, workers: int, max_pending: int, file_ttl: float):
+        self.max_pending = max_pending
+        self.file_ttl = file_ttl
+        # Removed with its remaining files when the queue is collected
+        self._files_dir = tempfile.TemporaryDirectory(prefix="jobs-")
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="job"
+        )
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, work: JobWork) -> JobStatus:
+        job = _Job(kind, work)
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status == JOB_QUEUED)
+            if pending >= self.max_pending:
+                raise JobQueueFullError(f"{pending} jobs are already waiting")
+            self._jobs[job.id] = job
+            self._evict()
+        self._executor.submit(self._run, job)
+        return job.view()
+
+    def _evict(self):
+        # Caller holds _lock
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.status in (JOB_SUCCEEDED, JOB_FAILED)
+        ]
+        for job_id in finished[: max(len(finished) - _HISTORY_SIZE, 0)]:
+            job = self._jobs.pop(job_id)
+            if job.file is not None:
+                job.file.remove()
+        now = time.monotonic()
+        for job in self._jobs.values():
+            if job.file is not None and job.file.expires_at <= now:
+                job.file.remove()
+                job.file = None
+
+    def _spool(self, job: _Job, job_file: JobFile) -> StoredJobFile:
+        fd, path = tempfile.mkstemp(prefix=f"{job.id}-", dir=self._files_dir.name)
+        with os.fdopen(fd, "wb") as f:
+            f.write(job_file.content)
+        return StoredJobFile(
+            Path(path),
+            job_file.filename,
+            job_file.media_type,
+            time.monotonic() + self.file_ttl,
+        )
+
+    def _run(self, job: _Job):
+        job.status = JOB_RUNNING
+        job.started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        status = JOB_FAILED
+        try:
+            outcome = job.work(job.progress)
+            if isinstance(outcome, JobFile):
+                job.file = self._spool(job, outcome)
+                job.result = {
+                    "filename": outcome.filename,
+                    "bytes": len(outcome.content),
+                }
+            else:
+                job.result = _result(outcome)
+            status = JOB_SUCCEEDED
+        except JobFailedError as e:
+            job.error = str(e)
+            job.result = _result(e.result)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            job.error = str(e) or type(e).__name__
+        finally:
+            job.progress.stop()
+            job.finished_at = datetime.now(timezone.utc)
+            job.status = status
+            JOB_DURATION.observe(time.perf_counter() - started, kind=job.kind)
+            JOBS_FINISHED.inc(kind=job.kind, result=status)
+            with self._lock:
+                self._evict()
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.view() if job is not None else None
+
+    def get_file(self, job_id: str) -> Optional[StoredJobFile]:
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return job.file if job is not None else None
+
+    def list(self) -> List[JobStatus]:
+        """Known jobs, most recently submitted first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.view() for job in reversed(jobs)]
+
+    def count(self, status: str) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == status)
+
+
+job_queue = JobQueue(
+    settings.job_workers, settings.job_queue_size, settings.job_file_ttl_seconds
+)
+
+JOBS = gauge("jobs", "Background jobs by state", ["status"])
+JOBS.set_callback(
+    lambda: {(status,): job_queue.count(status) for status in (JOB_QUEUED, JOB_RUNNING)}
+)
@@ -0,0 +1,250 @@
+import cProfile
+import hmac
+import io
+import pstats
+import threading
+import time
+import tracemalloc
+import types
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from config import settings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_TOKEN_HEADER = "x-profile-token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+_TOP_FUNCTIONS = 30
+_TOP_ALLOCATIONS = 15
+
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "active_profile", default=None
+)
+
+_PROFILES: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_profiles_lock = threading.Lock()
+
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, query: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = datetime.now(timezone.utc)
+        self.profiler = cProfile.Profile()
+        self.cpu_seconds = 0.0
+
+    def run_sync(self, func, *args, **kwargs):
+        cpu_started = time.thread_time()
+        try:
+            self.profiler.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.profiler.disable()
+            self.cpu_seconds += time.thread_time() - cpu_started
+
+    async def run_async(self, func, *args, **kwargs):
+        return await self._profile_steps(func(*args, **kwargs))
+
+    @types.coroutine
+    def _profile_steps(self, coroutine):
+        """
+        Drive ``coroutine`` one step at a time and profile only the steps,
+        not the other tasks the event loop runs while it is suspended.
+        """
+        value, error = None, None
+        while True:
+            try:
+                if error is None:
+                    suspended = self.run_sync(coroutine.send, value)
+                else:
+                    suspended = self.run_sync(coroutine.throw, error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value, error = (yield suspended), None
+            except GeneratorExit:
+                coroutine.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+    def top_functions(self, limit: int = _TOP_FUNCTIONS) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        if not stats.stats:
+            return []
+        stats.sort_stats(pstats.SortKey.CUMULATIVE)
+        result = []
+        for func in stats.fcn_list[:limit]:
+            primitive_calls, total_calls, total_time, cumulative_time, _ = stats.stats[
+                func
+            ]
+            filename, line, name = func
+            result.append(
+                {
+                    "function": f"{filename}:{line}({name})",
+                    "calls": total_calls,
+                    "primitive_calls": primitive_calls,
+                    "total_ms": round(total_time * 1000, 3),
+                    "cumulative_ms": round(cumulative_time * 1000, 3),
+                }
+            )
+        return result
+
+
+def get_active_profile() -> Optional[RequestProfile]:
+    return _active_profile.get()
+
+
+def is_profiling_allowed(token: Optional[str]) -> bool:
+    if settings.debug:
+        return True
+    return bool(settings.profile_token) and hmac.compare_digest(
+        (token or "").encode(), settings.profile_token.encode()
+    )
+
+
+def _start_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _tracemalloc_users += 1
+        tracemalloc.reset_peak()
+
+
+def _stop_tracemalloc():
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0:
+            tracemalloc.stop()
+
+
+def _allocation_stats(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, peak: int
+) -> Dict[str, Any]:
+    diff = after.compare_to(before, "lineno")
+    top = [
+        {
+            "location": str(stat.traceback),
+            "size_kb": round(stat.size_diff / 1024, 2),
+            "count": stat.count_diff,
+        }
+        for stat in diff[:_TOP_ALLOCATIONS]
+        if stat.size_diff > 0
+    ]
+    return {
+        "net_kb": round(sum(stat.size_diff for stat in diff) / 1024, 2),
+        "peak_kb": round(peak / 1024, 2),
+        "top": top,
+    }
+
+
+def _store_profile(report: Dict[str, Any]):
+    with _profiles_lock:
+        _PROFILES[report["id"]] = report
+        while len(_PROFILES) > settings.profile_history_size:
+            _PROFILES.popitem(last=False)
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    with _profiles_lock:
+        reports = list(_PROFILES.values())
+    keys = ("id", "method", "path", "status", "started_at", "wall_ms", "cpu_ms")
+    return [{key: report[key] for key in keys} for report in reversed(reports)]
+
+
+def get_profile(profile_id: str) -> Optional[Dict[str, Any]]:
+    with _profiles_lock:
+        return _PROFILES.get(profile_id)
+
+
+def _wants_profile(scope) -> bool:
+    headers = dict(scope.get("headers") or [])
+    if headers.get(PROFILE_HEADER.encode(), b"").decode() in ("1", "true"):
+        return True
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get("profile", [""])[-1] in ("1", "true")
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a single request when asked with ``?profile=1`` or ``X-Profile: 1``.
+
+    Allowed only in debug mode or with a matching ``X-Profile-Token``. The
+    report is stored in memory and its id returned in the ``X-Profile-Id``
+    header; see ``/api/v1/debug/profiles``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        token = headers.get(PROFILE_TOKEN_HEADER.encode(), b"").decode() or None
+        if not is_profiling_allowed(token):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            scope.get("method", ""),
+            scope.get("path", ""),
+            scope.get("query_string", b"").decode(),
+        )
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (PROFILE_ID_HEADER.encode(), profile.id.encode())
+                ]
+            await send(message)
+
+        _start_tracemalloc()
+        snapshot_before = tracemalloc.take_snapshot()
+        token_var = _active_profile.set(profile)
+        wall_started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            wall_seconds = time.perf_counter() - wall_started
+            _active_profile.reset(token_var)
+            snapshot_after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            _stop_tracemalloc()
+            _store_profile(
+                {
+                    "id": profile.id,
+                    "method": profile.method,
+                    "path": profile.path,
+                    "query": profile.query,
+                    "status": status_code,
+                    "started_at": profile.started_at.isoformat(),
+                    "wall_ms": round(wall_seconds * 1000, 3),
+                    "cpu_ms": round(profile.cpu_seconds * 1000, 3),
+                    "allocations": _allocation_stats(
+                        snapshot_before, snapshot_after, peak
+                    ),
+                    "functions": profile.top_functions(),
+                }
+            )
@@ -0,0 +1,207 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+from models.source import COUNTRY_CODES, HS_CODES
+from schemas.query_schemas import (
+    AggregationQuery,
+    AggregationResponse,
+    AggregationRow,
+    QueryAggregate,
+    QueryDimension,
+    QueryFilter,
+)
+from services.code_index_service import get_code_index
+from services.region_service import UNKNOWN_REGION
+from services.rollup_service import normalize_hs_code
+
+
+class QueryError(ValueError):
+    pass
+
+
+class QueryTooLargeError(QueryError):
+    pass
+
+
+def _matching_codes(query_filter: QueryFilter, counts: Dict[int, int]) -> List[int]:
+    exact = {normalize_hs_code(code) for code in query_filter.hs_codes or ()}
+    prefixes = tuple(normalize_hs_code(code) for code in query_filter.hs_prefixes or ())
+    if query_filter.hs_codes is None and query_filter.hs_prefixes is None:
+        return sorted(counts)
+    return sorted(
+        hs_id
+        for hs_id in counts
+        if HS_CODES.code(hs_id) in exact or HS_CODES.code(hs_id).startswith(prefixes)
+    )
+
+
+def _group_value(
+    dimension: QueryDimension, hs_group: str, year: int, country: Tuple[str, str, bool]
+):
+    if dimension is QueryDimension.HS_CODE:
+        return hs_group
+    if dimension is QueryDimension.YEAR:
+        return year
+    if dimension is QueryDimension.COUNTRY:
+        return country[0]
+    if dimension is QueryDimension.REGION:
+        return country[1]
+    return country[2]
+
+
+def _aggregate(
+    aggregate: QueryAggregate,
+    key: tuple,
+    cell: List[float],
+    groups: Dict[tuple, List[float]],
+    totals: Dict[Optional[int], float],
+    year_position: Optional[int],
+) -> Optional[float]:
+    total, rows = cell
+    if aggregate is QueryAggregate.SUM:
+        return total
+    if aggregate is QueryAggregate.MEAN:
+        return total / rows
+    if aggregate is QueryAggregate.COUNT:
+        return rows
+    if aggregate is QueryAggregate.SHARE:
+        base = totals[None if year_position is None else key[year_position]]
+        return total / base if base > 0 else 0.0
+    # Year over year; the group must exist in the previous year
+    previous_key = key[:year_position] + (key[year_position] - 1,)
+    previous = groups.get(previous_key + key[year_position + 1 :])
+    if previous is None or previous[0] <= 0:
+        return None
+    return total / previous[0] - 1
+
+
+def run_query(
+    query: AggregationQuery,
+    max_rows: Optional[int] = None,
+    max_groups: Optional[int] = None,
+) -> AggregationResponse:
+    """
+    Filter, group and aggregate import rows.
+
+    Rows are read per hs_code from the code index, so an hs_code filter only
+    touches matching codes. The number of rows to scan is known before the
+    scan starts; a query over ``max_rows`` rows, or one producing more than
+    ``max_groups`` groups, raises ``QueryTooLargeError``.
+    """
+    group_by = list(dict.fromkeys(query.group_by))
+    aggregates = list(dict.fromkeys(query.aggregates))
+    order_by = query.order_by or aggregates[0]
+    if order_by not in aggregates:
+        aggregates.append(order_by)
+    year_position = (
+        group_by.index(QueryDimension.YEAR) if QueryDimension.YEAR in group_by else None
+    )
+    if QueryAggregate.YOY in aggregates and year_position is None:
+        raise QueryError("yoy requires grouping by year")
+
+    index = get_code_index()
+    counts = index.import_row_counts()
+    codes = _matching_codes(query.filter, counts)
+    rows_scanned = sum(counts[hs_id] for hs_id in codes)
+    if max_rows is not None and rows_scanned > max_rows:
+        raise QueryTooLargeError(
+            f"Query would scan {rows_scanned} rows, the limit is {max_rows}; "
+            "narrow the hs_code filter"
+        )
+
+    query_filter = query.filter
+    year_from = query_filter.year_from
+    year_to = query_filter.year_to
+    country_ids = None
+    if query_filter.countries is not None:
+        country_ids = {
+            COUNTRY_CODES.lookup(code.strip().upper())
+            for code in query_filter.countries
+        }
+    regions = set(query_filter.regions) if query_filter.regions is not None else None
+    is_friendly = query_filter.is_friendly
+    metric = query.metric.value
+    hs_level = query.hs_level
+
+    # country_id -> (code, region, is_friendly); unknown countries are friendly
+    countries: Dict[int, Tuple[str, str, bool]] = {
+        country_id: (
+            country.code,
+            country.region or UNKNOWN_REGION,
+            country.is_friendly,
+        )
+        for country_id, country in index.countries.items()
+    }
+
+    # group key -> [metric total, rows]
+    groups: Dict[tuple, List[float]] = {}
+    rows_matched = 0
+    for hs_id in codes:
+        hs_code = HS_CODES.code(hs_id)
+        hs_group = hs_code[:hs_level] if hs_level else hs_code
+        for item in index.imports_for_id(hs_id):
+            if year_from is not None and item.year < year_from:
+                continue
+            if year_to is not None and item.year > year_to:
+                continue
+            if country_ids is not None and item.country_id not in country_ids:
+                continue
+            country = countries.get(item.country_id)
+            if country is None:
+                country = (item.country, UNKNOWN_REGION, True)
+            if regions is not None and country[1] not in regions:
+                continue
+            if is_friendly is not None and country[2] != is_friendly:
+                continue
+
+            key = tuple(
+                _group_value(dimension, hs_group, item.year, country)
+                for dimension in group_by
+            )
+            cell = groups.get(key)
+            if cell is None:
+                if max_groups is not None and len(groups) >= max_groups:
+                    raise QueryTooLargeError(
+                        f"Query produces more than {max_groups} groups; "
+                        "group by fewer dimensions or narrow the filter"
+                    )
+                cell = groups[key] = [0.0, 0]
+            cell[0] += getattr(item, metric)
+            cell[1] += 1
+            rows_matched += 1
+
+    # Share denominators: per year when grouped by year, else the grand total
+    totals: Dict[Optional[int], float] = {None: 0.0}
+    for key, cell in groups.items():
+        year = None if year_position is None else key[year_position]
+        totals[year] = totals.get(year, 0.0) + cell[0]
+
+    def order_key(key: tuple):
+        value = _aggregate(order_by, key, groups[key], groups, totals, year_position)
+        if value is None:
+            return (1, 0.0, key)
+        return (0, -value if query.descending else value, key)
+
+    top = heapq.nsmallest(query.limit, groups, key=order_key)
+    dimensions = [dimension.value for dimension in group_by]
+    rows = [
+        AggregationRow(
+            group=dict(zip(dimensions, key)),
+            **{
+                aggregate.value: _aggregate(
+                    aggregate, key, groups[key], groups, totals, year_position
+                )
+                for aggregate in aggregates
+            },
+        )
+        for key in top
+    ]
+    return AggregationResponse(
+        group_by=group_by,
+        metric=query.metric,
+        rows_scanned=rows_scanned,
+        rows_matched=rows_matched,
+        total_groups=len(groups),
+        truncated=len(groups) > len(rows),
+        rows=rows,
+    )
@@ -1,8 +1,11 @@
+import functools
 from dataclasses import dataclass, field
 from enum import IntEnum
 from typing import Dict, List, Optional, Tuple
 
 from models.source import SourceData
+from services.code_index_service import get_code_index
+from services.tracing_service import span
 
 
 class Measure(IntEnum):
@@ -223,6 +226,17 @@ class AnalysisInput:
         return self.periods_by_year.get(year)
 
 
+def _traced_branch(method):
+    name = f"trade_analyzer.{method.__name__.lstrip('_')}"
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with span(name, hs_code=self.data.hs_code):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class TradeAnalyzer:
     def __init__(self, data: AnalysisInput):
         self.data = data
@@ -265,6 +279,7 @@ class TradeAnalyzer:
 
         return self.recommended_measures, self.analysis_steps
 
+    @_traced_branch
     def _evaluate_high_share(self):
         is_sufficient = self.data.production_consumption.is_production_sufficient
         self.log_step(f"Производство >= потребления: {is_sufficient}")
@@ -278,6 +293,7 @@ class TradeAnalyzer:
             self.log_step("Шаг 4.1.1.2: Производство < потребления → Мера 6")
             self.recommended_measures.append(Measure.MEASURE_6)
 
+    @_traced_branch
     def _evaluate_low_share(self):
         has_potential = self.data.tariff_data.has_tariff_increase_potential
         is_sufficient = self.data.production_consumption.is_production_sufficient
@@ -323,6 +339,7 @@ class TradeAnalyzer:
             self._analyze_non_tariff_measures()
             return
 
+    @_traced_branch
     def _analyze_china_case(self):
         current_period = self.data.current_period
         top_supplier = current_period.get_top_supplier()
@@ -426,6 +443,7 @@ class TradeAnalyzer:
             self.log_step("СКЦ Китая не ниже прочих → Мера 6")
             self.recommended_measures.append(Measure.MEASURE_6)
 
+    @_traced_branch
     def _analyze_non_tariff_measures(self):
         self.log_step("Раздел II: анализ нетарифных мер")
 
@@ -520,19 +538,36 @@ def _ensure_unique_ordered(measures: List[Measure]) -> List[int]:
 class RecommendationService:
     def __init__(self, source_data: SourceData):
         self.source_data = source_data
-        self._country_cache: Dict[str, bool] = {
-            country.code: country.is_friendly for country in source_data.countries
+        self.code_index = get_code_index(source_data)
+        self._country_cache: Dict[int, bool] = {
+            country.country_id: country.is_friendly for country in source_data.countries
         }
-        self._country_name_cache: Dict[str, str] = {
-            country.code: country.name or country.code
+        self._country_name_cache: Dict[int, str] = {
+            country.country_id: country.name or country.code
             for country in source_data.countries
         }
 
     def recommend(self, hs_code: str) -> Tuple[List[int], List[str]]:
-        analysis_input = self._build_analysis_input(hs_code)
+        _analysis_input, measures, reasons = self.recommend_with_input(hs_code)
+        return measures, reasons
+
+    def recommend_with_input(
+        self, hs_code: str
+    ) -> Tuple[Optional[AnalysisInput], List[int], List[str]]:
+        """``recommend`` plus the analysis input the decision was based on."""
+        with span("recommendation.build_input", hs_code=hs_code):
+            analysis_input = self._build_analysis_input(hs_code)
         if not analysis_input:
-            return [int(Measure.MEASURE_6)], []
+            return None, [int(Measure.MEASURE_6)], []
 
+        with span("trade_analyzer.analyze", hs_code=hs_code):
+            measures, reasons = self.recommend_for_input(analysis_input)
+        return analysis_input, measures, reasons
+
+    @staticmethod
+    def recommend_for_input(
+        analysis_input: AnalysisInput,
+    ) -> Tuple[List[int], List[str]]:
         analyzer = TradeAnalyzer(analysis_input)
         measures, _steps = analyzer.analyze()
 
@@ -541,8 +576,40 @@ class RecommendationService:
             return [int(Measure.MEASURE_6)], _steps
         return ordered, _steps
 
+    def build_all_analysis_inputs(self) -> Dict[str, AnalysisInput]:
+        """
+        Build analysis inputs for every hs_code with import data from the
+        per-code index instead of filtering each source table once per code.
+        """
+        imports_by_code = self.code_index.imports_by_code()
+
+        result: Dict[str, AnalysisInput] = {}
+        for hs_code, records in imports_by_code.items():
+            analysis_input = self._assemble_analysis_input(
+                hs_code,
+                self._group_imports(records),
+                self.code_index.volumes_for(hs_code),
+                self._get_restrictions(hs_code),
+            )
+            if analysis_input:
+                result[hs_code] = analysis_input
+        return result
+
     def _build_analysis_input(self, hs_code: str) -> Optional[AnalysisInput]:
-        imports_by_year = self._collect_imports(hs_code)
+        return self._assemble_analysis_input(
+            hs_code,
+            self._collect_imports(hs_code),
+            self.code_index.volumes_for(hs_code),
+            self._get_restrictions(hs_code),
+        )
+
+    def _assemble_analysis_input(
+        self,
+        hs_code: str,
+        imports_by_year: Dict[int, List[CountryImportData]],
+        volumes: List,
+        restrictions: Dict[str, object],
+    ) -> Optional[AnalysisInput]:
         if not imports_by_year:
             return None
 
@@ -558,10 +625,10 @@ class RecommendationService:
         previous_period = periods_by_year.get(previous_year) if previous_year else None
 
         production_data = self._collect_production_consumption(
-            hs_code, current_year, previous_year
+            volumes, current_year, previous_year
         )
-        tariff_data = self._collect_tariff_data(hs_code)
-        non_tariff_data = self._collect_non_tariff_data(hs_code)
+        tariff_data = self._collect_tariff_data(restrictions)
+        non_tariff_data = self._collect_non_tariff_data(restrictions)
 
         return AnalysisInput(
             hs_code=hs_code,
@@ -575,13 +642,14 @@ class RecommendationService:
         )
 
     def _collect_imports(self, hs_code: str) -> Dict[int, List[CountryImportData]]:
+        return self._group_imports(self.code_index.imports_for(hs_code))
+
+    def _group_imports(self, records) -> Dict[int, List[CountryImportData]]:
         result: Dict[int, List[CountryImportData]] = {}
-        for record in self.source_data.import_by_country:
-            if record.hs_code != hs_code:
-                continue
+        for record in records:
             country_code = record.country
-            country_name = self._country_name_cache.get(country_code, country_code)
-            is_friendly = self._country_cache.get(country_code, True)
+            country_name = self._country_name_cache.get(record.country_id, country_code)
+            is_friendly = self._country_cache.get(record.country_id, True)
             import_value = float(record.volume)
             import_quantity = float(record.quantity)
 
@@ -601,14 +669,12 @@ class RecommendationService:
         return result
 
     def _collect_production_consumption(
-        self, hs_code: str, current_year: int, previous_year: Optional[int]
+        self, volumes: List, current_year: int, previous_year: Optional[int]
     ) -> ProductionConsumptionData:
         production_by_year: Dict[int, float] = {}
         consumption_by_year: Dict[int, float] = {}
 
-        for record in self.source_data.volumes_general:
-            if record.hs_code != hs_code:
-                continue
+        for record in volumes:
             if record.type == "production":
                 production_by_year[record.year] = record.volume
             elif record.type == "consumption":
@@ -627,9 +693,7 @@ class RecommendationService:
             production_history=production_by_year,
         )
 
-    def _collect_tariff_data(self, hs_code: str) -> TariffData:
-        restrictions = self._get_restrictions(hs_code)
-
+    def _collect_tariff_data(self, restrictions: Dict[str, object]) -> TariffData:
         applied = _parse_float(restrictions.get("customs_duty_rate"))
         wto_max = _parse_float(restrictions.get("customs_duty_rate_wto"))
 
@@ -640,8 +704,9 @@ class RecommendationService:
             applied_tariff=applied_percent, wto_maximum_tariff=wto_percent
         )
 
-    def _collect_non_tariff_data(self, hs_code: str) -> Optional[NonTariffData]:
-        restrictions = self._get_restrictions(hs_code)
+    def _collect_non_tariff_data(
+        self, restrictions: Dict[str, object]
+    ) -> Optional[NonTariffData]:
         if not restrictions:
             return None
 
@@ -659,9 +724,8 @@ class RecommendationService:
 
     def _get_restrictions(self, hs_code: str) -> Dict[str, object]:
         result: Dict[str, object] = {}
-        for restriction in self.source_data.restrictions:
-            if restriction.hs_code == hs_code:
-                result[restriction.key] = restriction.value
+        for restriction in self.code_index.restrictions_for(hs_code):
+            result[restriction.key] = restriction.value
         return result
 
 
@@ -0,0 +1,147 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from models.dashboard import FriendlinessShareItem, RegionShareItem
+from models.source import ImportByCountryRow, SourceData
+from services.metrics_service import record_cache
+from services.rollup_service import hs_prefixes, normalize_hs_code
+from services.source_service import (
+    add_change_listener,
+    add_dataset_warmer,
+    get_source_data,
+    hold_writers,
+    register_index_tables,
+)
+
+UNKNOWN_REGION = "Неизвестно"
+
+_INDEX_NAME = "region_aggregates"
+
+_lock = threading.Lock()
+
+
+class RegionIndex:
+    """
+    Import totals per HS code (and HS prefix) x year x region and
+    x year x friendliness, joined against ``countries`` once at build time.
+    Writers change cells in place under ``_lock``; readers copy under it.
+    """
+
+    def __init__(self, source: SourceData):
+        # Unknown countries are treated as friendly, as in RecommendationService
+        self.country_region: Dict[int, Tuple[str, bool]] = {
+            country.country_id: (country.region or UNKNOWN_REGION, country.is_friendly)
+            for country in source.countries
+        }
+        # hs_code -> (year, region) -> [volume, quantity, rows]
+        self.by_region: Dict[str, Dict[Tuple[int, str], List[float]]] = {}
+        # hs_code -> (year, is_friendly) -> [volume, quantity, rows]
+        self.by_friendliness: Dict[str, Dict[Tuple[int, bool], List[float]]] = {}
+        for item in source.import_by_country:
+            self.apply_import(item)
+
+    @staticmethod
+    def _add(table: Dict, prefix: str, key, item: ImportByCountryRow, sign: int):
+        cells = table.setdefault(prefix, {})
+        cell = cells.get(key)
+        if cell is None:
+            cell = cells[key] = [0.0, 0.0, 0]
+        cell[0] += sign * item.volume
+        cell[1] += sign * item.quantity
+        cell[2] += sign
+        if cell[2] <= 0:
+            del cells[key]
+        if not cells:
+            del table[prefix]
+
+    def apply_import(self, item: ImportByCountryRow, sign: int = 1):
+        region, is_friendly = self.country_region.get(
+            item.country_id, (UNKNOWN_REGION, True)
+        )
+        for prefix in hs_prefixes(item.hs_code):
+            self._add(self.by_region, prefix, (item.year, region), item, sign)
+            self._add(
+                self.by_friendliness, prefix, (item.year, is_friendly), item, sign
+            )
+
+    @staticmethod
+    def _cells(table: Dict, hs_code: str) -> Dict[tuple, Tuple[float, float]]:
+        # Copied under the lock: writers change cells in place
+        with _lock:
+            return {
+                key: (cell[0], cell[1])
+                for key, cell in table.get(normalize_hs_code(hs_code), {}).items()
+            }
+
+    def region_shares(self, hs_code: str) -> List[RegionShareItem]:
+        cells = self._cells(self.by_region, hs_code)
+        totals = _year_totals(cells)
+        return [
+            RegionShareItem(
+                year=year,
+                region=region,
+                volume=cell[0],
+                quantity=cell[1],
+                share_percent=_share(cell[0], totals[year]),
+            )
+            for (year, region), cell in sorted(
+                cells.items(), key=lambda entry: (entry[0][0], -entry[1][0])
+            )
+        ]
+
+    def friendliness_shares(self, hs_code: str) -> List[FriendlinessShareItem]:
+        cells = self._cells(self.by_friendliness, hs_code)
+        totals = _year_totals(cells)
+        return [
+            FriendlinessShareItem(
+                year=year,
+                is_friendly=is_friendly,
+                volume=cell[0],
+                quantity=cell[1],
+                share_percent=_share(cell[0], totals[year]),
+            )
+            for (year, is_friendly), cell in sorted(cells.items())
+        ]
+
+
+def _year_totals(
+    cells: Dict[Tuple[int, object], Tuple[float, float]],
+) -> Dict[int, float]:
+    totals: Dict[int, float] = {}
+    for (year, _), cell in cells.items():
+        totals[year] = totals.get(year, 0.0) + cell[0]
+    return totals
+
+
+def _share(volume: float, total: float) -> float:
+    # Same convention as ImportStructureItem.share_percent: a fraction of 1
+    return volume / total if total > 0 else 0.0
+
+
+def get_region_index(source: Optional[SourceData] = None) -> RegionIndex:
+    source = source or get_source_data()
+    index = source.peek_index(_INDEX_NAME)
+    record_cache(_INDEX_NAME, index is not None)
+    if index is not None:
+        return index
+    # A row written during the build would also be applied by _on_source_change
+    with hold_writers(), _lock:
+        return source.get_index(_INDEX_NAME, RegionIndex)
+
+
+def _on_source_change(table: str, old, new):
+    if table != "import_by_country":
+        return
+    with _lock:
+        index = get_source_data().peek_index(_INDEX_NAME)
+        if index is None:
+            return
+        if old is not None:
+            index.apply_import(old, -1)
+        if new is not None:
+            index.apply_import(new, 1)
+
+
+add_change_listener(_on_source_change)
+register_index_tables(_INDEX_NAME, ("countries", "import_by_country"))
+add_dataset_warmer(lambda source: source.get_index(_INDEX_NAME, RegionIndex))
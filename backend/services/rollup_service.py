@@ -0,0 +1,158 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from models.source import ImportByCountryRow, SourceData, VolumeGeneralRow
+from services.metrics_service import record_cache
+from services.source_service import (
+    add_change_listener,
+    add_dataset_warmer,
+    get_source_data,
+    hold_writers,
+    register_index_tables,
+)
+
+# HS hierarchy levels: chapter, heading, subheading, national sub-levels
+HS_LEVELS = (2, 4, 6, 8, 10)
+
+_INDEX_NAME = "hs_rollup"
+
+_lock = threading.Lock()
+
+
+def normalize_hs_code(code: str) -> str:
+    return code.replace(" ", "").replace(".", "").strip()
+
+
+def hs_prefixes(hs_code: str) -> List[str]:
+    code = normalize_hs_code(hs_code)
+    return [code[:level] for level in HS_LEVELS if level <= len(code)]
+
+
+class RollupCube:
+    """
+    Import and volume totals aggregated by HS prefix x country/type x year.
+
+    Each cell keeps the number of source rows folded into it so that cells,
+    and prefixes without cells, disappear when their last row is deleted.
+    Writers change cells in place under ``_lock``; readers copy under it.
+    """
+
+    def __init__(self):
+        # prefix -> (country, year) -> [volume, quantity, rows]
+        self.imports: Dict[str, Dict[Tuple[str, int], List[float]]] = {}
+        # prefix -> (type, year) -> [volume, rows]
+        self.volumes: Dict[str, Dict[Tuple[str, int], List[float]]] = {}
+
+    @staticmethod
+    def _apply(
+        table: Dict[str, Dict[tuple, List[float]]],
+        hs_code: str,
+        key: tuple,
+        amounts: Tuple[float, ...],
+        sign: int,
+    ):
+        # Cell layout: the amounts, then the row count
+        for prefix in hs_prefixes(hs_code):
+            cells = table.get(prefix)
+            if cells is None:
+                if sign < 0:
+                    continue
+                cells = table[prefix] = {}
+            cell = cells.get(key)
+            if cell is None:
+                if sign < 0:
+                    continue
+                cell = cells[key] = [0.0] * len(amounts) + [0]
+            for i, amount in enumerate(amounts):
+                cell[i] += sign * amount
+            cell[-1] += sign
+            if cell[-1] <= 0:
+                del cells[key]
+                if not cells:
+                    del table[prefix]
+
+    def apply_import(self, item: ImportByCountryRow, sign: int = 1):
+        self._apply(
+            self.imports,
+            item.hs_code,
+            (item.country, item.year),
+            (item.volume, item.quantity),
+            sign,
+        )
+
+    def apply_volume(self, item: VolumeGeneralRow, sign: int = 1):
+        self._apply(
+            self.volumes, item.hs_code, (item.type, item.year), (item.volume,), sign
+        )
+
+    def import_rows(self, prefix: str) -> List[ImportByCountryRow]:
+        with _lock:
+            cells = [
+                (country, year, cell[0], cell[1])
+                for (country, year), cell in self.imports.get(prefix, {}).items()
+            ]
+        return [
+            ImportByCountryRow(
+                hs_code=prefix,
+                country=country,
+                year=year,
+                volume=volume,
+                quantity=quantity,
+            )
+            for country, year, volume, quantity in cells
+        ]
+
+    def volume_rows(self, prefix: str) -> List[VolumeGeneralRow]:
+        with _lock:
+            cells = [
+                (type_, year, cell[0])
+                for (type_, year), cell in self.volumes.get(prefix, {}).items()
+            ]
+        return [
+            VolumeGeneralRow(hs_code=prefix, type=type_, year=year, volume=volume)
+            for type_, year, volume in cells
+        ]
+
+    def has_prefix(self, prefix: str) -> bool:
+        with _lock:
+            return prefix in self.imports or prefix in self.volumes
+
+
+def build_rollup_cube(source: SourceData) -> RollupCube:
+    cube = RollupCube()
+    for item in source.import_by_country:
+        cube.apply_import(item)
+    for item in source.volumes_general:
+        cube.apply_volume(item)
+    return cube
+
+
+def get_rollup_cube(source: Optional[SourceData] = None) -> RollupCube:
+    source = source or get_source_data()
+    cube = source.peek_index(_INDEX_NAME)
+    record_cache(_INDEX_NAME, cube is not None)
+    if cube is not None:
+        return cube
+    # A row written during the build would also be applied by _on_source_change
+    with hold_writers(), _lock:
+        return source.get_index(_INDEX_NAME, build_rollup_cube)
+
+
+def _on_source_change(table: str, old, new):
+    if table not in ("import_by_country", "volumes_general"):
+        return
+    with _lock:
+        cube = get_source_data().peek_index(_INDEX_NAME)
+        if cube is None:
+            # Not built yet; it will be built from the current rows on first use
+            return
+        apply = cube.apply_import if table == "import_by_country" else cube.apply_volume
+        if old is not None:
+            apply(old, -1)
+        if new is not None:
+            apply(new, 1)
+
+
+add_change_listener(_on_source_change)
+register_index_tables(_INDEX_NAME, ("import_by_country", "volumes_general"))
+add_dataset_warmer(lambda source: source.get_index(_INDEX_NAME, build_rollup_cube))
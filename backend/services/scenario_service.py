@@ -0,0 +1,141 @@
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+
+from schemas.scenario_schemas import (
+    ScenarioAdjustment,
+    ScenarioOutcome,
+    ScenarioProductResult,
+)
+from services.job_service import JobProgress
+from services.recommendation_service import (
+    AnalysisInput,
+    CountryImportData,
+    RecommendationService,
+)
+from services.rollup_service import normalize_hs_code
+from services.screening_service import get_analysis_inputs
+
+
+class ScenarioTooLargeError(ValueError):
+    pass
+
+
+def _scale(value: float, change: float) -> float:
+    return value * (1.0 + change)
+
+
+def apply_adjustment(
+    data: AnalysisInput, adjustment: ScenarioAdjustment
+) -> AnalysisInput:
+    """Return a copy of ``data`` with the scenario applied to the current year."""
+    result = data
+
+    country_changes = adjustment.country_import_change
+    if adjustment.unfriendly_import_change or country_changes:
+        imports: List[CountryImportData] = []
+        for imp in data.current_period.imports:
+            change = country_changes.get(imp.country_code, 0.0)
+            if not imp.is_friendly:
+                change += adjustment.unfriendly_import_change
+            change = max(change, -1.0)
+            imports.append(
+                replace(
+                    imp,
+                    import_value=_scale(imp.import_value, change),
+                    import_quantity=_scale(imp.import_quantity, change),
+                )
+                if change
+                else imp
+            )
+        imports.sort(key=lambda item: item.import_value, reverse=True)
+        current_period = replace(data.current_period, imports=imports)
+        result = replace(
+            result,
+            current_period=current_period,
+            periods_by_year={**data.periods_by_year, data.current_year: current_period},
+        )
+
+    if adjustment.production_change or adjustment.consumption_change:
+        production = data.production_consumption
+        current_production = _scale(production.production, adjustment.production_change)
+        history = dict(production.production_history)
+        if data.current_year in history:
+            history[data.current_year] = current_production
+        result = replace(
+            result,
+            production_consumption=replace(
+                production,
+                production=current_production,
+                consumption=_scale(
+                    production.consumption, adjustment.consumption_change
+                ),
+                production_history=history,
+            ),
+        )
+
+    if adjustment.applied_tariff is not None or adjustment.tariff_to_wto_bound:
+        tariffs = data.tariff_data
+        applied = (
+            adjustment.applied_tariff
+            if adjustment.applied_tariff is not None
+            else tariffs.wto_maximum_tariff
+        )
+        result = replace(result, tariff_data=replace(tariffs, applied_tariff=applied))
+
+    return result
+
+
+def run_scenarios(
+    scenarios: List[ScenarioAdjustment],
+    hs_codes: Optional[List[str]] = None,
+    max_evaluations: Optional[int] = None,
+    progress: Optional[JobProgress] = None,
+) -> Tuple[List[ScenarioProductResult], List[str]]:
+    """
+    Re-run the measure logic for every scenario x hs_code pair.
+
+    Base inputs come from the per-dataset cache shared with screening and are
+    never modified; each scenario works on shallow copies.
+    """
+    inputs = get_analysis_inputs()
+    if hs_codes is None:
+        codes = sorted(inputs)
+        missing: List[str] = []
+    else:
+        normalized = [normalize_hs_code(code) for code in hs_codes]
+        codes = [code for code in dict.fromkeys(normalized) if code in inputs]
+        missing = [code for code in dict.fromkeys(normalized) if code not in inputs]
+
+    evaluations = len(codes) * (len(scenarios) + 1)
+    if max_evaluations is not None and evaluations > max_evaluations:
+        raise ScenarioTooLargeError(
+            f"{evaluations} evaluations requested, the limit is {max_evaluations}"
+        )
+
+    if progress is not None:
+        progress.start_stage("evaluating", evaluations)
+    results: List[ScenarioProductResult] = []
+    for hs_code in codes:
+        base = inputs[hs_code]
+        baseline, _steps = RecommendationService.recommend_for_input(base)
+        baseline_set = set(baseline)
+        outcomes = []
+        for scenario in scenarios:
+            measures, _steps = RecommendationService.recommend_for_input(
+                apply_adjustment(base, scenario)
+            )
+            measure_set = set(measures)
+            outcomes.append(
+                ScenarioOutcome(
+                    scenario=scenario.name,
+                    measures=measures,
+                    added=sorted(measure_set - baseline_set),
+                    removed=sorted(baseline_set - measure_set),
+                )
+            )
+        results.append(
+            ScenarioProductResult(hs_code=hs_code, baseline=baseline, outcomes=outcomes)
+        )
+        if progress is not None:
+            progress.advance(len(scenarios) + 1)
+    return results, missing
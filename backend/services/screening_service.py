@@ -0,0 +1,236 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.source import SourceData
+from schemas.screening_schemas import ScreeningItem
+from services.metrics_service import record_cache
+from services.recommendation_service import (
+    AnalysisInput,
+    Measure,
+    RecommendationService,
+)
+from services.source_service import (
+    add_change_listener,
+    add_dataset_warmer,
+    get_source_data,
+    register_index_reloader,
+)
+
+_INDEX_NAME = "screening"
+_INPUTS_INDEX_NAME = "analysis_inputs"
+
+# Held while the caches are built or updated
+_lock = threading.RLock()
+
+# Guards the pending changes of every cache. Change listeners run inside
+# source writes, so they only record what changed under this short lock
+_changes_lock = threading.Lock()
+
+
+def _china_indicators(
+    data: AnalysisInput,
+) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[float]]:
+    """Current and 3-year average China share, China and other countries' СКЦ."""
+    current = data.current_period
+    if not current.get_country("CN"):
+        return None, None, None, None
+
+    previous_years = sorted(
+        year for year in data.periods_by_year if year < data.current_year
+    )[-3:]
+    previous_shares = [
+        data.periods_by_year[year].share_of_country("CN")
+        for year in previous_years
+        if data.periods_by_year[year].get_country("CN")
+    ]
+    average_share = (
+        sum(previous_shares) / len(previous_shares) if previous_shares else None
+    )
+    return (
+        current.share_of_country("CN"),
+        average_share,
+        current.get_country("CN").average_contract_price,
+        current.get_average_price_excluding("CN"),
+    )
+
+
+def build_screening_item(data: AnalysisInput, measures: List[int]) -> ScreeningItem:
+    current = data.current_period
+    previous = data.previous_period
+    top_supplier = current.get_top_supplier()
+    china_share, china_share_avg, china_price, others_price = _china_indicators(data)
+    tariffs = data.tariff_data
+    return ScreeningItem(
+        hs_code=data.hs_code,
+        measures=measures,
+        current_year=data.current_year,
+        total_import=current.total_import_value,
+        unfriendly_share=current.unfriendly_share,
+        unfriendly_share_previous=previous.unfriendly_share if previous else None,
+        production=data.production_consumption.production,
+        consumption=data.production_consumption.consumption,
+        applied_tariff=tariffs.applied_tariff,
+        wto_tariff=tariffs.wto_maximum_tariff,
+        tariff_headroom=tariffs.wto_maximum_tariff - tariffs.applied_tariff,
+        top_supplier=top_supplier.country_code if top_supplier else None,
+        china_share=china_share,
+        china_share_avg_3y=china_share_avg,
+        china_contract_price=china_price,
+        others_contract_price=others_price,
+    )
+
+
+def _build_analysis_inputs(source: SourceData) -> Dict[str, AnalysisInput]:
+    return RecommendationService(source).build_all_analysis_inputs()
+
+
+def _screen_catalogue(inputs: Dict[str, AnalysisInput]) -> Dict[str, ScreeningItem]:
+    result: Dict[str, ScreeningItem] = {}
+    for hs_code, analysis_input in inputs.items():
+        measures, _steps = RecommendationService.recommend_for_input(analysis_input)
+        result[hs_code] = build_screening_item(analysis_input, measures)
+    return result
+
+
+class _ScreeningCache:
+    """
+    Analysis inputs and screening items of one dataset, built on first use.
+
+    Source changes only mark their codes; the next reader recomputes just
+    those. The dicts are replaced, never updated in place, since callers
+    read them without the lock.
+    """
+
+    def __init__(
+        self,
+        inputs: Optional[Dict[str, AnalysisInput]] = None,
+        results: Optional[Dict[str, ScreeningItem]] = None,
+        changed: Iterable[str] = (),
+    ):
+        self.inputs = inputs
+        self.results = results
+        # Codes to recompute, and those being recomputed (under _changes_lock)
+        self.changed: Set[str] = set(changed)
+        self.applying: Set[str] = set()
+        # Bumped when everything changed, voiding builds in progress
+        self.generation = 0
+
+    def mark(self, codes: Iterable[str]):
+        with _changes_lock:
+            self.changed.update(codes)
+
+    def mark_all(self):
+        with _changes_lock:
+            self.inputs = self.results = None
+            self.changed.clear()
+            self.generation += 1
+
+    def carry_over(self, codes: Set[str]) -> "_ScreeningCache":
+        """A copy for a new dataset in which ``codes`` changed."""
+        with _changes_lock:
+            return _ScreeningCache(
+                self.inputs, self.results, self.changed | self.applying | codes
+            )
+
+    def analysis_inputs(self, source: SourceData) -> Dict[str, AnalysisInput]:
+        # Caller holds _lock
+        self._apply_changes(source)
+        inputs = self.inputs
+        record_cache(_INPUTS_INDEX_NAME, inputs is not None)
+        if inputs is None:
+            generation = self.generation
+            inputs = _build_analysis_inputs(source)
+            with _changes_lock:
+                if self.generation == generation:
+                    self.inputs = inputs
+        return inputs
+
+    def screening_results(self, source: SourceData) -> Dict[str, ScreeningItem]:
+        # Caller holds _lock
+        self._apply_changes(source)
+        results = self.results
+        record_cache(_INDEX_NAME, results is not None)
+        if results is None:
+            generation = self.generation
+            results = _screen_catalogue(self.analysis_inputs(source))
+            with _changes_lock:
+                if self.generation == generation:
+                    self.results = results
+        return results
+
+    def _apply_changes(self, source: SourceData):
+        with _changes_lock:
+            codes, self.changed = self.changed, set()
+            if self.inputs is None or not codes:
+                return
+            self.applying = codes
+            inputs = dict(self.inputs)
+            results = dict(self.results) if self.results is not None else None
+        service = RecommendationService(source)
+        for hs_code in codes:
+            analysis_input, measures, _reasons = service.recommend_with_input(hs_code)
+            if analysis_input is None:
+                inputs.pop(hs_code, None)
+                if results is not None:
+                    results.pop(hs_code, None)
+                continue
+            inputs[hs_code] = analysis_input
+            if results is not None:
+                results[hs_code] = build_screening_item(analysis_input, measures)
+        with _changes_lock:
+            if self.inputs is not None:
+                self.inputs, self.results = inputs, results
+            self.applying = set()
+
+
+def _get_cache(source: SourceData) -> _ScreeningCache:
+    return source.get_index(_INDEX_NAME, lambda _: _ScreeningCache())
+
+
+def get_analysis_inputs(
+    source: Optional[SourceData] = None,
+) -> Dict[str, AnalysisInput]:
+    """Analysis inputs for every hs_code, cached per dataset. Treat as read-only."""
+    source = source or get_source_data()
+    with _lock:
+        return _get_cache(source).analysis_inputs(source)
+
+
+def get_screening_results(
+    source: Optional[SourceData] = None,
+) -> Dict[str, ScreeningItem]:
+    """Recommended measures and key indicators for every hs_code, cached per dataset."""
+    source = source or get_source_data()
+    with _lock:
+        return _get_cache(source).screening_results(source)
+
+
+def screen_measures(
+    measures: List[Measure], match_all: bool = False
+) -> Tuple[int, List[ScreeningItem]]:
+    results = get_screening_results()
+    wanted = {int(measure) for measure in measures}
+    matched = []
+    for hs_code in sorted(results):
+        item = results[hs_code]
+        applied = wanted.intersection(item.measures)
+        if (match_all and applied == wanted) or (not match_all and applied):
+            matched.append(item)
+    return len(results), matched
+
+
+def _on_source_change(table: str, old, new):
+    cache = get_source_data().peek_index(_INDEX_NAME)
+    if cache is None:
+        return
+    codes = {row.hs_code for row in (old, new) if getattr(row, "hs_code", None)}
+    if codes:
+        cache.mark(codes)
+    else:
+        # Country changes affect every code
+        cache.mark_all()
+
+
+add_change_listener(_on_source_change)
+add_dataset_warmer(get_screening_results)
+register_index_reloader(_INDEX_NAME, _ScreeningCache.carry_over)
@@ -0,0 +1,234 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlencode
+
+from config import settings
+from models.dashboard import CaseStudy, ImpactMeasure
+from services.case_search_service import get_historical_index
+from services.recommendation_service import AnalysisInput, Measure
+
+# Historical measure ids (``measures`` in historical_similarities.json) that
+# count as precedents for each recommended measure
+_MEASURE_PRECEDENTS: Dict[Measure, Tuple[int, ...]] = {
+    Measure.MEASURE_1: (1, 2),
+    Measure.MEASURE_2: (2, 6),
+    Measure.MEASURE_3: (3,),
+    Measure.MEASURE_4: (4,),
+    Measure.MEASURE_5: (5, 7, 8),
+    Measure.MEASURE_6: (),
+}
+
+# Numeric features, standardized against the historical products
+_NUMERIC_FEATURES = (
+    "applied_tariff",
+    "tariff_headroom",
+    "certification",
+    "procurement_ban",
+    "order_4114",
+    "unfriendly_pressure",
+    "import_dependence",
+)
+# Weight of a shared HS chapter (2 digits) and heading (4 digits)
+_CHAPTER_WEIGHT = 2.0
+_HEADING_WEIGHT = 2.0
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _first_number(value: Optional[str]) -> Optional[float]:
+    match = _NUMBER_RE.search(value or "")
+    return float(match.group().replace(",", ".")) if match else None
+
+
+def _import_dependence(indicators: Dict[str, str]) -> Optional[float]:
+    """Share of consumption covered by imports before the measure, 0..1."""
+    text = (indicators.get("cons_before") or indicators.get("потр_до") or "").lower()
+    percent = _first_number(text)
+    if "рф" in text and percent is not None:
+        return max(0.0, 1 - percent / 100)
+    if "импорт" in text:
+        if percent is not None:
+            return min(1.0, percent / 100)
+        return 0.5 if "частично" in text else 0.8
+    return None
+
+
+def _historical_features(product: dict) -> Dict[str, Optional[float]]:
+    rates = product.get("rates") or {}
+    flags = product.get("regulatory_flags") or {}
+    discrimination = product.get("discrimination") or {}
+    applied = _first_number(rates.get("before"))
+    wto = _first_number(rates.get("wto"))
+    duty_nd = discrimination.get("duty_nd")
+    return {
+        "applied_tariff": applied,
+        "tariff_headroom": (
+            max(wto - applied, 0.0) if applied is not None and wto is not None else None
+        ),
+        "certification": float(flags["тр тс"]) if "тр тс" in flags else None,
+        "procurement_ban": (
+            float(flags["пп рф 1875"]) if "пп рф 1875" in flags else None
+        ),
+        "order_4114": float(flags["приказ 4114"]) if "приказ 4114" in flags else None,
+        "unfriendly_pressure": (
+            float(duty_nd > 0) if isinstance(duty_nd, (int, float)) else None
+        ),
+        "import_dependence": _import_dependence(product.get("indicators") or {}),
+    }
+
+
+def _current_features(data: AnalysisInput) -> Dict[str, float]:
+    tariffs = data.tariff_data
+    non_tariff = data.non_tariff_data
+    volumes = data.production_consumption
+    if volumes.consumption > 0:
+        dependence = min(1.0, max(0.0, 1 - volumes.production / volumes.consumption))
+    else:
+        dependence = 0.5
+    return {
+        "applied_tariff": tariffs.applied_tariff,
+        "tariff_headroom": max(tariffs.wto_maximum_tariff - tariffs.applied_tariff, 0),
+        "certification": float(
+            bool(non_tariff and non_tariff.has_certification_requirement)
+        ),
+        "procurement_ban": float(
+            bool(non_tariff and non_tariff.in_government_procurement_list)
+        ),
+        "order_4114": float(
+            bool(non_tariff and non_tariff.in_minpromtorg_exception_list)
+        ),
+        "unfriendly_pressure": data.current_period.unfriendly_share / 100,
+        "import_dependence": dependence,
+    }
+
+
+def _impact(product: dict) -> List[ImpactMeasure]:
+    rates = product.get("rates") or {}
+    before = _first_number(rates.get("before"))
+    after = _first_number(rates.get("after"))
+    if before is None or after is None:
+        return []
+    return [
+        ImpactMeasure(
+            measure="Ставка ввозной пошлины, %",
+            before=round(before),
+            after=round(after),
+        )
+    ]
+
+
+@dataclass
+class _Case:
+    measures: frozenset
+    # Unit-length feature vector
+    vector: List[float]
+    study: CaseStudy
+
+
+class SimilarCaseIndex:
+    """
+    Unit-normalized feature vectors of historical products, so that matching
+    a dashboard is one dot product per candidate case.
+
+    Numeric features are standardized against the historical products (gaps
+    are filled with the feature mean); HS chapter and heading are one-hot
+    columns, so cosine similarity also rewards a close HS code.
+    """
+
+    def __init__(self, data: dict):
+        products = data.get("products", [])
+        theses = data.get("product_theses", [])
+        raw = [_historical_features(product) for product in products]
+
+        self.means: Dict[str, float] = {}
+        self.scales: Dict[str, float] = {}
+        for name in _NUMERIC_FEATURES:
+            values = [row[name] for row in raw if row[name] is not None]
+            mean = sum(values) / len(values) if values else 0.0
+            variance = (
+                sum((value - mean) ** 2 for value in values) / len(values)
+                if values
+                else 0.0
+            )
+            self.means[name] = mean
+            self.scales[name] = math.sqrt(variance) or 1.0
+
+        chapters = sorted({product["hs_code"][:2] for product in products})
+        headings = sorted({product["hs_code"][:4] for product in products})
+        offset = len(_NUMERIC_FEATURES)
+        self.chapter_columns = {code: offset + i for i, code in enumerate(chapters)}
+        offset += len(chapters)
+        self.heading_columns = {code: offset + i for i, code in enumerate(headings)}
+        self.width = offset + len(headings)
+
+        self.cases: List[_Case] = []
+        for i, product in enumerate(products):
+            values = {
+                name: self.means[name] if value is None else value
+                for name, value in raw[i].items()
+            }
+            description = product["name"]
+            if i < len(theses) and theses[i].startswith(description):
+                description = theses[i]
+            query = urlencode({"q": product["name"], "kind": "product"})
+            self.cases.append(
+                _Case(
+                    measures=frozenset(product.get("measures", [])),
+                    vector=self._vector(values, product["hs_code"]),
+                    study=CaseStudy(
+                        description=description,
+                        case_url=f"{settings.api_base_url}/api/v1/"
+                        f"historical-similarities/search?{query}",
+                        impact=_impact(product),
+                    ),
+                )
+            )
+
+    def _vector(self, values: Dict[str, float], hs_code: str) -> List[float]:
+        vector = [
+            (values[name] - self.means[name]) / self.scales[name]
+            for name in _NUMERIC_FEATURES
+        ]
+        vector.extend([0.0] * (self.width - len(vector)))
+        chapter = self.chapter_columns.get(hs_code[:2])
+        if chapter is not None:
+            vector[chapter] = _CHAPTER_WEIGHT
+        heading = self.heading_columns.get(hs_code[:4])
+        if heading is not None:
+            vector[heading] = _HEADING_WEIGHT
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def similar_cases(
+        self, data: AnalysisInput, measures: Sequence[int], top_k: int
+    ) -> Dict[int, List[CaseStudy]]:
+        """Top ``top_k`` precedents per recommended measure, most similar first."""
+        query = self._vector(_current_features(data), data.hs_code)
+        scores = [sum(a * b for a, b in zip(query, case.vector)) for case in self.cases]
+        result: Dict[int, List[CaseStudy]] = {}
+        for code in measures:
+            try:
+                precedents = _MEASURE_PRECEDENTS[Measure(code)]
+            except ValueError:
+                precedents = ()
+            ranked = sorted(
+                (-scores[i], i)
+                for i, case in enumerate(self.cases)
+                if case.measures.intersection(precedents)
+            )
+            result[code] = [self.cases[i].study for _score, i in ranked[:top_k]]
+        return result
+
+
+def find_similar_cases(
+    data: Optional[AnalysisInput], measures: Sequence[int]
+) -> Dict[int, List[CaseStudy]]:
+    if data is None:
+        return {}
+    try:
+        index = get_historical_index("similar_cases", SimilarCaseIndex)
+    except FileNotFoundError:
+        return {}
+    return index.similar_cases(data, measures, settings.similar_cases_top_k)
@@ -1,117 +1,986 @@
+import asyncio
 import csv
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import List
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+from pydantic import BaseModel
+from config import settings
 from models.source import (
-    CountryInfo,
+    CountryInfoRow,
     SourceData,
     ImportByCountry,
+    ImportByCountryRow,
     VolumeGeneral,
+    VolumeGeneralRow,
     Restriction,
+    RestrictionRow,
 )
 from fastapi.responses import StreamingResponse
+from services.job_service import JobProgress
+from services.metrics_service import gauge, record_cache
+from services.wal_service import WriteAheadLog
 import io
 
+_DATA_DIR = Path("./data")
+
+# Rows between progress updates of long operations
+_PROGRESS_ROWS = 10_000
+
 # Global source data instance
 _source_data = SourceData()
 _source_is_loaded = False
 
+# table -> (mtime_ns, size) of data/<table>.csv as last read or written by us
+_file_signatures: Dict[str, Tuple[int, int]] = {}
+
 
 def get_source_data():
     global _source_is_loaded, _source_data
     if not _source_is_loaded:
+        # Only the first call can miss; recording every lookup would swamp it
+        record_cache("source_data", False)
+        # Taken before reading, so a file replaced meanwhile is seen as changed
+        _file_signatures.update(_data_file_signatures(ROW_PARSERS))
         _source_data = _load_source_data()
+        if settings.wal_enabled:
+            _replay_log(_source_data)
         _source_is_loaded = True
         # print("[INFO] Data Preloaded")
     return _source_data
 
 
-def _load_source_data(src_dir: Path = Path("./data")) -> SourceData:
+def _source_row_counts():
+    if not _source_is_loaded:
+        return {}
+    return {
+        ("countries",): len(_source_data.countries),
+        ("import_by_country",): len(_source_data.import_by_country),
+        ("volumes_general",): len(_source_data.volumes_general),
+        ("restrictions",): len(_source_data.restrictions),
+    }
 
-    ds = SourceData()
 
-    with open(src_dir / "countries.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            # Normalize boolean: accept "true"/"false", "1"/"0", etc.
-            is_friendly_raw = row.get("is_friendly", "").strip().lower()
-            if is_friendly_raw in ("false", "0", "no", "f", ""):
-                is_friendly = False
-            else:
-                is_friendly = True
-
-            ds.countries.append(
-                CountryInfo(
-                    code=row.get("code", "").strip(),
-                    name=row.get("name", "").strip(),
-                    region=row.get("region", "").strip(),
-                    is_friendly=is_friendly,
+SOURCE_ROWS = gauge("source_rows", "Rows held per source table", ["table"])
+SOURCE_ROWS.set_callback(_source_row_counts)
+
+
+ChangeListener = Callable[[str, Optional[Any], Optional[Any]], None]
+
+_change_listeners: List[ChangeListener] = []
+
+
+def add_change_listener(listener: ChangeListener):
+    """
+    Register a callback invoked after every row change as
+    ``listener(table, old_item, new_item)``; ``old_item`` is None for inserts
+    and ``new_item`` is None for deletes.
+    """
+    _change_listeners.append(listener)
+
+
+def _notify_change(table: str, old: Optional[Any], new: Optional[Any]):
+    for listener in _change_listeners:
+        listener(table, old, new)
+    for item in (old, new):
+        hs_code = getattr(item, "hs_code", None)
+        if hs_code:
+            change_bus.publish(hs_code)
+
+
+class ChangeSubscription:
+    """
+    Wake-up handle for one asyncio waiter interested in an HS code or prefix.
+
+    Notifications coalesce: any number of changes published while the
+    subscriber is busy result in a single wake-up.
+    """
+
+    def __init__(self, key: str, loop: asyncio.AbstractEventLoop):
+        self.key = key
+        self.loop = loop
+        self.event = asyncio.Event()
+        self.pending = False
+
+    def _wake(self):
+        if self.pending:
+            return
+        self.pending = True
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self):
+        await self.event.wait()
+        self.pending = False
+        self.event.clear()
+
+
+class ChangeBus:
+    """
+    Routes row changes to asyncio subscribers keyed by HS code prefix.
+
+    Publishing happens from whichever thread mutated the data; only
+    subscriptions whose key is a prefix of the changed hs_code are woken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, Set[ChangeSubscription]] = {}
+
+    def subscribe(self, key: str) -> ChangeSubscription:
+        # Must be called from the event loop the subscriber waits on
+        subscription = ChangeSubscription(key, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(key, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: ChangeSubscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.key)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.key]
+
+    def publish(self, hs_code: str):
+        code = hs_code.replace(" ", "").replace(".", "").strip()
+        with self._lock:
+            if not self._subscriptions:
+                return
+            woken = [
+                subscription
+                for length in range(1, len(code) + 1)
+                for subscription in self._subscriptions.get(code[:length], ())
+            ]
+        for subscription in woken:
+            subscription._wake()
+
+    def publish_all(self):
+        with self._lock:
+            woken = [
+                subscription
+                for subscriptions in self._subscriptions.values()
+                for subscription in subscriptions
+            ]
+        for subscription in woken:
+            subscription._wake()
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(items) for items in self._subscriptions.values())
+
+
+change_bus = ChangeBus()
+
+
+# CSV columns of every source table, as written to data/*.csv
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "countries": ("code", "name", "region", "is_friendly"),
+    "import_by_country": ("hs_code", "country", "year", "volume", "quantity"),
+    "volumes_general": ("hs_code", "type", "year", "volume"),
+    "restrictions": ("hs_code", "key", "value"),
+}
+
+# Tables writable through the API: stored row class and row key
+_MUTABLE_TABLES: Dict[str, Tuple[Type, Tuple[str, ...]]] = {
+    "import_by_country": (ImportByCountryRow, ("hs_code", "country", "year")),
+    "volumes_general": (VolumeGeneralRow, ("hs_code", "type", "year")),
+    "restrictions": (RestrictionRow, ("hs_code", "key")),
+}
+
+_source_log = WriteAheadLog(Path(settings.wal_file))
+
+_write_lock = threading.RLock()
+_write_state = threading.local()
+_compaction_lock = threading.Lock()
+
+
+@contextmanager
+def write_batch():
+    """
+    Serialize source mutations and make them durable together.
+
+    Nested batches join the outermost one, which waits for a single log
+    fsync after releasing the lock so concurrent writers share it.
+    """
+    with _write_lock:
+        depth = getattr(_write_state, "depth", 0)
+        _write_state.depth = depth + 1
+        try:
+            yield
+        finally:
+            _write_state.depth = depth
+            last_seq = _source_log.last_seq
+    if depth == 0 and settings.wal_enabled:
+        _source_log.wait_durable(last_seq)
+        if _source_log.size_bytes >= settings.wal_compact_bytes:
+            threading.Thread(
+                target=compact_source_log, name="wal-compaction", daemon=True
+            ).start()
+
+
+@contextmanager
+def hold_writers():
+    """
+    Keep source writers out, e.g. while building an index that change
+    listeners update, so that no row is both read by the build and applied
+    to it by a listener. Take it before the index's own lock.
+    """
+    with _write_lock:
+        yield
+
+
+class ChangesUnavailableError(Exception):
+    pass
+
+
+class ChangeLog:
+    """
+    Latest change per row key of each mutable table, kept in version order,
+    so that listing the changes since a version costs time proportional to
+    their number rather than to the table size.
+
+    Every mutation gets the next version. Versions start from the process
+    start time in microseconds, so they keep growing across restarts;
+    changes made before the start, or before a table was replaced as a
+    whole, are not known and need a full export.
+    """
+
+    def __init__(self):
+        self.version = time.time_ns() // 1000
+        # table -> oldest version changes can be listed from
+        self.floors: Dict[str, int] = {table: self.version for table in _MUTABLE_TABLES}
+        # table -> row key -> (version, row, or None once deleted)
+        self.entries: Dict[str, "OrderedDict[tuple, Tuple[int, Any]]"] = {
+            table: OrderedDict() for table in _MUTABLE_TABLES
+        }
+
+    def record(self, table: str, key: tuple, row: Optional[Any]):
+        # Caller holds _write_lock
+        self.version += 1
+        entries = self.entries[table]
+        entries.pop(key, None)
+        entries[key] = (self.version, row)
+
+    def reset(self, tables: Iterable[str]):
+        """Forget the changes of tables that were replaced as a whole."""
+        # Caller holds _write_lock
+        self.version += 1
+        for table in tables:
+            if table in self.entries:
+                self.entries[table].clear()
+                self.floors[table] = self.version
+
+    def since(
+        self, table: str, version: int
+    ) -> Tuple[List[Tuple[int, tuple, Optional[Any]]], int]:
+        """
+        (version, key, row or None if deleted) of the keys changed after
+        ``version``, oldest first, and the current version.
+        """
+        with _write_lock:
+            if version < self.floors[table] or version > self.version:
+                raise ChangesUnavailableError(
+                    f"Changes of {table} are known from version "
+                    f"{self.floors[table]} to {self.version}; export the full table"
                 )
-            )
+            changes = []
+            for key, (changed, row) in reversed(self.entries[table].items()):
+                if changed <= version:
+                    break
+                changes.append((changed, key, row))
+            current = self.version
+        changes.reverse()
+        return changes, current
 
-    with open(src_dir / "import_by_country.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            item = ImportByCountry(
-                hs_code=row["hs_code"],
-                country=row["country"],
-                year=int(row["year"]),
-                volume=float(row["volume"]),
-                quantity=float(row["quantity"]),
-            )
-            ds.import_by_country.append(item)
 
-    with open(src_dir / "volumes_general.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            item = VolumeGeneral(
-                hs_code=row["hs_code"],
-                type=row["type"],
-                year=int(row["year"]),
-                volume=float(row["volume"]),
+_changes = ChangeLog()
+
+
+def get_source_version() -> int:
+    """Version of the last change to the source tables."""
+    return _changes.version
+
+
+def _row_key(table: str, values) -> tuple:
+    key_fields = _MUTABLE_TABLES[table][1]
+    if isinstance(values, dict):
+        return tuple(values[field] for field in key_fields)
+    return tuple(getattr(values, field) for field in key_fields)
+
+
+def _to_row(table: str, item: BaseModel):
+    return _MUTABLE_TABLES[table][0](**item.model_dump())
+
+
+def _log_upsert(table: str, item):
+    _changes.record(table, _row_key(table, item), item)
+    if settings.wal_enabled:
+        row = {column: getattr(item, column) for column in TABLE_COLUMNS[table]}
+        _source_log.append({"op": "upsert", "table": table, "row": row})
+
+
+def _log_delete(table: str, **key):
+    _changes.record(table, _row_key(table, key), None)
+    if settings.wal_enabled:
+        _source_log.append({"op": "delete", "table": table, "key": key})
+
+
+def _replay_log(ds: SourceData):
+    """Re-apply logged mutations on top of the CSV snapshot."""
+    tables: Dict[str, List[Optional[Any]]] = {}
+    positions: Dict[str, Dict[tuple, List[int]]] = {}
+    for record in _source_log.read_records():
+        table = record["table"]
+        if table not in tables:
+            rows = tables[table] = list(getattr(ds, table))
+            positions[table] = {}
+            for i, item in enumerate(rows):
+                positions[table].setdefault(_row_key(table, item), []).append(i)
+        rows, index = tables[table], positions[table]
+        if record["op"] == "upsert":
+            item = _MUTABLE_TABLES[table][0](**record["row"])
+            key = _row_key(table, item)
+            if key in index:
+                # Same as save_*: the first matching row is replaced
+                rows[index[key][0]] = item
+            else:
+                index[key] = [len(rows)]
+                rows.append(item)
+        else:
+            for i in index.pop(_row_key(table, record["key"]), []):
+                rows[i] = None
+    for table, rows in tables.items():
+        setattr(ds, table, [item for item in rows if item is not None])
+
+
+def _write_table_rows(f, table: str, rows: List[Any]):
+    """
+    Rows in the format of the CSVs in ``data/``: countries as quoted text with
+    a 1/0 flag and LF line ends, the other tables with CRLF and whole volumes
+    without ``.0`` (quantities keep it). A restriction value of None is
+    written as an empty field, and text that ``parse_restriction_value``
+    would read as another type (including the empty string) is quoted, so
+    that ``_read_restrictions`` gets back the same value.
+    """
+    columns = TABLE_COLUMNS[table]
+    if table == "countries":
+        writer = csv.writer(f, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+        writer.writerow(columns)
+        for item in rows:
+            values = [item.name, item.region, int(item.is_friendly)]
+            if item.code:
+                writer.writerow([item.code] + values)
+            else:
+                # A missing code is an empty field, not a quoted one
+                f.write(",")
+                writer.writerow(values)
+        return
+    volume = columns.index("volume") if "volume" in columns else None
+    writer = csv.writer(f)
+    leading = csv.writer(f, lineterminator="")
+    writer.writerow(columns)
+    for item in rows:
+        values = [getattr(item, column) for column in columns]
+        if volume is not None and values[volume].is_integer():
+            values[volume] = int(values[volume])
+        value = values[-1]
+        if isinstance(value, str) and (
+            not value or not isinstance(parse_restriction_value(value), str)
+        ):
+            # csv.writer would leave it unquoted
+            leading.writerow(values[:-1])
+            f.write(',"' + value.replace('"', '""') + '"\r\n')
+        else:
+            writer.writerow(values)
+
+
+def _stage_snapshot(tables: Dict[str, List[Any]], dst_dir: Path) -> List[Path]:
+    """Write tables next to their CSVs as fsynced ``.tmp`` files."""
+    staged = []
+    for table, rows in tables.items():
+        tmp_path = dst_dir / f"{table}.csv.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            _write_table_rows(f, table, rows)
+            f.flush()
+            os.fsync(f.fileno())
+        staged.append(tmp_path)
+    return staged
+
+
+def _commit_snapshot(staged: List[Path]):
+    for tmp_path in staged:
+        path = tmp_path.with_suffix("")
+        os.replace(tmp_path, path)
+        if path.parent == _DATA_DIR:
+            _file_signatures.update(_data_file_signatures([path.stem]))
+    if staged and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(staged[0].parent, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def compact_source_log():
+    """
+    Fold the write-ahead log into the CSV snapshot. Writers are only held
+    back while the log is rotated; the CSVs are written afterwards. Replaying
+    a segment over a snapshot that already contains it is harmless, so a
+    crash at any point leaves a recoverable state.
+    """
+    if not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        with _write_lock:
+            source_data = get_source_data()
+            tables = {
+                table: list(getattr(source_data, table)) for table in _MUTABLE_TABLES
+            }
+            _source_log.rotate()
+        _commit_snapshot(_stage_snapshot(tables, _DATA_DIR))
+        _source_log.discard_segment()
+    finally:
+        _compaction_lock.release()
+
+
+DatasetWarmer = Callable[[SourceData], None]
+
+_dataset_warmers: List[DatasetWarmer] = []
+
+_publish_lock = threading.Lock()
+_previous_source_data: Optional[SourceData] = None
+_dataset_version = 0
+
+
+def add_dataset_warmer(warmer: DatasetWarmer):
+    """
+    Register a callback that builds derived indexes on a dataset before it is
+    published by ``publish_source_data``. The dataset is not visible to
+    requests yet, so warmers need no locking.
+    """
+    _dataset_warmers.append(warmer)
+
+
+def warm_source_data(source: SourceData):
+    for warmer in _dataset_warmers:
+        warmer(source)
+
+
+def get_dataset_version() -> int:
+    """Incremented every time the whole dataset is replaced or rolled back."""
+    return _dataset_version
+
+
+def has_previous_source_data() -> bool:
+    return _previous_source_data is not None
+
+
+def _install_source_data(
+    source: SourceData, tables: Iterable[str] = tuple(TABLE_COLUMNS)
+) -> SourceData:
+    # Caller holds _write_lock; ``tables`` are the ones that were replaced
+    global _source_data, _source_is_loaded, _dataset_version
+    current = get_source_data()
+    _source_data = source
+    _source_is_loaded = True
+    _dataset_version += 1
+    _changes.reset(tables)
+    return current
+
+
+def _swap_source_data(source: SourceData) -> SourceData:
+    with _compaction_lock:
+        staged = (
+            _stage_snapshot(
+                {table: getattr(source, table) for table in TABLE_COLUMNS}, _DATA_DIR
             )
-            ds.volumes_general.append(item)
+            if settings.wal_enabled
+            else []
+        )
+        with _write_lock:
+            if settings.wal_enabled:
+                # Logged changes belong to the dataset being replaced. They go
+                # first: after a crash before the new files are in place, the
+                # old files come back without them, but a crash after must
+                # not replay them over the new files
+                _source_log.rotate()
+                _source_log.discard_segment()
+                _commit_snapshot(staged)
+            current = _install_source_data(source)
+    change_bus.publish_all()
+    return current
 
-    with open(src_dir / "restrictions.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            item = Restriction(
+
+def publish_source_data(source: SourceData):
+    """
+    Atomically replace the served dataset. Requests already holding the old
+    one finish on it; it is kept for ``rollback_source_data``.
+    """
+    global _previous_source_data
+    with _publish_lock:
+        _previous_source_data = _swap_source_data(source)
+
+
+def rollback_source_data() -> bool:
+    global _previous_source_data
+    with _publish_lock:
+        previous = _previous_source_data
+        if previous is None:
+            return False
+        _previous_source_data = _swap_source_data(previous)
+    return True
+
+
+# Derived index name -> source tables it is built from
+_index_tables: Dict[str, FrozenSet[str]] = {}
+
+IndexReloader = Callable[[Any, Set[str]], Optional[Any]]
+
+# Derived index name -> callback carrying it over a reload of its tables
+_index_reloaders: Dict[str, IndexReloader] = {}
+
+# Reload attempts made without holding writers off while warming
+_RELOAD_ATTEMPTS = 3
+
+
+def register_index_tables(name: str, tables: Iterable[str]):
+    """
+    Declare which source tables a derived index reads, so that reloading
+    other tables carries the index over instead of rebuilding it. Indexes
+    that are not declared are rebuilt on every reload.
+    """
+    _index_tables[name] = frozenset(tables)
+
+
+def register_index_reloader(name: str, reload: IndexReloader):
+    """
+    Let a derived index follow a reload of the tables it reads instead of
+    being rebuilt. ``reload(index, hs_codes)`` gets the current dataset's
+    index and the hs_codes whose rows the reload changed, and returns the
+    index for the new dataset, or None to rebuild it. It is not used when
+    rows without an hs_code (countries) change.
+    """
+    _index_reloaders[name] = reload
+
+
+def _changed_hs_codes(
+    tables: Iterable[str], old: SourceData, new: SourceData
+) -> Optional[Set[str]]:
+    """
+    hs_codes of the rows that differ between two versions of ``tables``, or
+    None if countries differ, which affects every code.
+    """
+    codes: Set[str] = set()
+    for table in tables:
+        columns = TABLE_COLUMNS[table]
+        old_rows = Counter(
+            tuple(getattr(item, column) for column in columns)
+            for item in getattr(old, table)
+        )
+        new_rows = Counter(
+            tuple(getattr(item, column) for column in columns)
+            for item in getattr(new, table)
+        )
+        changed = (old_rows - new_rows) + (new_rows - old_rows)
+        if not changed:
+            continue
+        if "hs_code" not in columns:
+            return None
+        hs_code = columns.index("hs_code")
+        codes.update(values[hs_code] for values in changed)
+    return codes
+
+
+def _data_file_signatures(tables: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+    signatures = {}
+    for table in tables:
+        try:
+            stat = (_DATA_DIR / f"{table}.csv").stat()
+        except FileNotFoundError:
+            continue
+        signatures[table] = (stat.st_mtime_ns, stat.st_size)
+    return signatures
+
+
+def changed_source_tables() -> Dict[str, Tuple[int, int]]:
+    """
+    Tables whose CSV in ``data/`` differs from what the served dataset was
+    loaded from or last wrote, with their current file signatures.
+    """
+    if not _source_is_loaded:
+        # Nothing served yet; the first load reads the current files
+        return {}
+    return {
+        table: signature
+        for table, signature in _data_file_signatures(ROW_PARSERS).items()
+        if _file_signatures.get(table) != signature
+    }
+
+
+def reload_source_tables(tables: Iterable[str]):
+    """
+    Re-read the given tables from ``data/`` and publish a new dataset version
+    that shares every other table with the current one.
+
+    Derived indexes that do not read the reloaded tables move over to the
+    new dataset, registered reloaders update theirs for the changed codes,
+    and the rest are rebuilt before it is published. The new dataset is
+    built and warmed without holding writers off; if one wrote meanwhile it
+    is built again, and the last attempt holds them off throughout, so no
+    change is lost. Logged changes to the reloaded tables are dropped: the
+    file wins.
+    """
+    global _previous_source_data
+    tables = [table for table in ROW_PARSERS if table in set(tables)]
+    with _publish_lock, _compaction_lock:
+        signatures = _data_file_signatures(tables)
+        reloaded = _load_source_data(tables=tables)
+        for attempt in range(_RELOAD_ATTEMPTS):
+            last_attempt = attempt == _RELOAD_ATTEMPTS - 1
+            with _write_lock if last_attempt else nullcontext():
+                with _write_lock:
+                    current = get_source_data()
+                    version = _changes.version
+                    source = SourceData()
+                    previous = SourceData()
+                    for table in TABLE_COLUMNS:
+                        rows = list(getattr(current, table))
+                        if table in tables:
+                            setattr(source, table, getattr(reloaded, table))
+                            setattr(previous, table, rows)
+                        else:
+                            setattr(source, table, rows)
+                    # Shared until the switch; writers make this attempt void
+                    carried = [
+                        name
+                        for name, depends_on in _index_tables.items()
+                        if depends_on.isdisjoint(tables)
+                    ]
+                    for name in carried:
+                        index = current.peek_index(name)
+                        if index is not None:
+                            source.set_index(name, index)
+                    current_indexes = {
+                        name: current.peek_index(name) for name in _index_reloaders
+                    }
+                hs_codes = _changed_hs_codes(tables, previous, source)
+                if hs_codes is not None:
+                    for name, reload in _index_reloaders.items():
+                        index = current_indexes[name]
+                        if index is not None:
+                            index = reload(index, hs_codes)
+                        if index is not None:
+                            source.set_index(name, index)
+                warm_source_data(source)
+                with _write_lock:
+                    if _changes.version != version:
+                        continue
+                    for name in carried:
+                        # The previous dataset must not share a mutable index
+                        current.take_index(name)
+                    if settings.wal_enabled:
+                        _source_log.rotate()
+                        _source_log.filter_segment(
+                            lambda record: record["table"] not in tables
+                        )
+                    _previous_source_data = _install_source_data(source, tables)
+                    _file_signatures.update(signatures)
+                    break
+    change_bus.publish_all()
+
+
+def _parse_country(row: Dict[str, str]) -> CountryInfoRow:
+    # Normalize boolean: accept "true"/"false", "1"/"0", etc.
+    is_friendly_raw = row.get("is_friendly", "").strip().lower()
+    if is_friendly_raw in ("false", "0", "no", "f", ""):
+        is_friendly = False
+    else:
+        is_friendly = True
+
+    return CountryInfoRow(
+        code=row.get("code", "").strip(),
+        name=row.get("name", "").strip(),
+        region=row.get("region", "").strip(),
+        is_friendly=is_friendly,
+    )
+
+
+def _parse_import_by_country(row: Dict[str, str]) -> ImportByCountryRow:
+    return ImportByCountryRow(
+        hs_code=row["hs_code"],
+        country=row["country"],
+        year=int(row["year"]),
+        volume=float(row["volume"]),
+        quantity=float(row["quantity"]),
+    )
+
+
+def _parse_volume_general(row: Dict[str, str]) -> VolumeGeneralRow:
+    return VolumeGeneralRow(
+        hs_code=row["hs_code"],
+        type=row["type"],
+        year=int(row["year"]),
+        volume=float(row["volume"]),
+    )
+
+
+def parse_restriction_value(text: str) -> Union[bool, int, float, str]:
+    """
+    Restriction value of a CSV field: true/false are booleans, as
+    ``is_friendly`` in countries.csv, numbers are numbers and anything else
+    stays text.
+    """
+    cleaned = text.strip().lower()
+    if cleaned in ("true", "false"):
+        return cleaned == "true"
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        return text
+
+
+def _parse_restriction(row: Dict[str, str]) -> RestrictionRow:
+    value = row["value"]
+    return RestrictionRow(
+        hs_code=row["hs_code"],
+        key=row["key"],
+        value=parse_restriction_value(value) if value is not None else None,
+    )
+
+
+# Source tables in load order with their CSV row parsers
+ROW_PARSERS: Dict[str, Callable[[Dict[str, str]], Any]] = {
+    "countries": _parse_country,
+    "import_by_country": _parse_import_by_country,
+    "volumes_general": _parse_volume_general,
+    "restrictions": _parse_restriction,
+}
+
+
+class _TrackedLines:
+    """File lines fed to a CSV reader, remembering the last one read."""
+
+    def __init__(self, f):
+        self.lines = iter(f)
+        self.last = ""
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        self.last = next(self.lines)
+        return self.last
+
+
+def _read_restrictions(f) -> List[RestrictionRow]:
+    # A quoted value is kept as text; an unquoted empty one is None
+    lines = _TrackedLines(f)
+    reader = csv.DictReader(lines)
+    value_last = bool(reader.fieldnames) and reader.fieldnames[-1] == "value"
+    rows = []
+    for row in reader:
+        if value_last and lines.last.rstrip("\r\n").endswith('"'):
+            item = RestrictionRow(
                 hs_code=row["hs_code"], key=row["key"], value=row["value"]
             )
-            ds.restrictions.append(item)
+        else:
+            item = _parse_restriction(row)
+            if value_last and item.value == "":
+                item.value = None
+        rows.append(item)
+    return rows
+
+
+def _load_source_data(
+    src_dir: Path = _DATA_DIR, tables: Optional[Iterable[str]] = None
+) -> SourceData:
+
+    ds = SourceData()
+
+    for table, parse in ROW_PARSERS.items():
+        if tables is not None and table not in tables:
+            continue
+        with open(src_dir / f"{table}.csv", "r", encoding="utf-8", newline="") as f:
+            if table == "restrictions":
+                setattr(ds, table, _read_restrictions(f))
+                continue
+            reader = csv.DictReader(f)
+            setattr(ds, table, [parse(row) for row in reader])
 
     return ds
 
 
+def upsert_rows(
+    table: str, items: List[Any], progress: Optional[JobProgress] = None
+) -> Tuple[int, int]:
+    """
+    Insert or replace stored rows by key in one write batch, like calling
+    ``save_*`` for each item but with a single pass over the table.
+    Returns (inserted, updated).
+    """
+    inserted = updated = 0
+    with write_batch():
+        rows = getattr(get_source_data(), table)
+        positions: Dict[tuple, int] = {}
+        for i, existing in enumerate(rows):
+            # save_* replaces the first matching row
+            positions.setdefault(_row_key(table, existing), i)
+        for item in items:
+            _log_upsert(table, item)
+            key = _row_key(table, item)
+            i = positions.get(key)
+            if i is None:
+                positions[key] = len(rows)
+                rows.append(item)
+                old = None
+                inserted += 1
+            else:
+                old = rows[i]
+                rows[i] = item
+                updated += 1
+            _notify_change(table, old, item)
+            if progress is not None and (inserted + updated) % _PROGRESS_ROWS == 0:
+                progress.advance(_PROGRESS_ROWS)
+    if progress is not None:
+        progress.advance(len(items) % _PROGRESS_ROWS)
+    return inserted, updated
+
+
+def table_csv(table: str, progress: Optional[JobProgress] = None) -> bytes:
+    """Current rows of ``table`` as CSV, with the columns of ``data/*.csv``."""
+    rows = list(getattr(get_source_data(), table))
+    columns = TABLE_COLUMNS[table]
+    if progress is not None:
+        progress.start_stage("exporting", len(rows))
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(columns)
+    for start in range(0, len(rows), _PROGRESS_ROWS):
+        writer.writerows(
+            [getattr(item, column) for column in columns]
+            for item in rows[start : start + _PROGRESS_ROWS]
+        )
+        if progress is not None:
+            progress.advance(min(_PROGRESS_ROWS, len(rows) - start))
+    return output.getvalue().encode()
+
+
+def _table_snapshot(table: str) -> Tuple[List[Any], int]:
+    """Rows of ``table`` and the source version they reflect."""
+    with _write_lock:
+        return list(getattr(get_source_data(), table)), _changes.version
+
+
+def _change_lines(
+    table: str, changes: List[Tuple[int, tuple, Optional[Any]]]
+) -> Iterator[bytes]:
+    columns = TABLE_COLUMNS[table]
+    key_fields = _MUTABLE_TABLES[table][1]
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(("version", "op") + columns)
+    for start in range(0, len(changes), _PROGRESS_ROWS):
+        for version, key, row in changes[start : start + _PROGRESS_ROWS]:
+            if row is not None:
+                values = [getattr(row, column) for column in columns]
+                writer.writerow([version, "upsert"] + values)
+            else:
+                values = dict(zip(key_fields, key))
+                writer.writerow(
+                    [version, "delete"] + [values.get(column, "") for column in columns]
+                )
+        yield output.getvalue().encode()
+        output.seek(0)
+        output.truncate()
+    if not changes:
+        yield output.getvalue().encode()
+
+
+def export_changes_csv(table: str, since_version: int) -> StreamingResponse:
+    """
+    Keys of ``table`` upserted or deleted after ``since_version``, one line
+    per key with its latest state: ``version,op`` and the table columns,
+    where deleted rows only carry their key columns. ``X-Source-Version``
+    is the version to pass next time.
+    """
+    changes, version = _changes.since(table, since_version)
+    return StreamingResponse(
+        _change_lines(table, changes),
+        media_type="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename={table}.changes.csv",
+            "X-Source-Version": str(version),
+        },
+    )
+
+
 # ImportByCountry operations
-def get_import_by_country() -> List[ImportByCountry]:
+def get_import_by_country() -> List[ImportByCountryRow]:
     return get_source_data().import_by_country
 
 
 def save_import_by_country(item: ImportByCountry):
-    # Check if item already exists
-    found = False
-    for i, existing_item in enumerate(get_source_data().import_by_country):
-        if (
-            existing_item.hs_code == item.hs_code
-            and existing_item.country == item.country
-            and existing_item.year == item.year
-        ):
-            get_source_data().import_by_country[i] = item
-            found = True
-            break
+    item = _to_row("import_by_country", item)
+    with write_batch():
+        _log_upsert("import_by_country", item)
+        # Check if item already exists
+        old = None
+        for i, existing_item in enumerate(get_source_data().import_by_country):
+            if (
+                existing_item.hs_code == item.hs_code
+                and existing_item.country == item.country
+                and existing_item.year == item.year
+            ):
+                get_source_data().import_by_country[i] = item
+                old = existing_item
+                break
 
-    if not found:
-        get_source_data().import_by_country.append(item)
+        if old is None:
+            get_source_data().import_by_country.append(item)
+        _notify_change("import_by_country", old, item)
 
 
 def delete_import_by_country(hs_code: str, country: str, year: int):
-    get_source_data().import_by_country = [
-        item
-        for item in get_source_data().import_by_country
-        if not (
-            item.hs_code == hs_code and item.country == country and item.year == year
-        )
-    ]
+    with write_batch():
+        source_data = get_source_data()
+        kept, removed = [], []
+        for item in source_data.import_by_country:
+            if (
+                item.hs_code == hs_code
+                and item.country == country
+                and item.year == year
+            ):
+                removed.append(item)
+            else:
+                kept.append(item)
+        if removed:
+            _log_delete(
+                "import_by_country", hs_code=hs_code, country=country, year=year
+            )
+        source_data.import_by_country = kept
+        for item in removed:
+            _notify_change("import_by_country", item, None)
 
 
 def export_import_by_country_csv():
@@ -119,7 +988,8 @@ def export_import_by_country_csv():
     writer = csv.writer(output)
     writer.writerow(["hs_code", "country", "year", "volume", "quantity"])
 
-    for item in get_source_data().import_by_country:
+    rows, version = _table_snapshot("import_by_country")
+    for item in rows:
         writer.writerow(
             [item.hs_code, item.country, item.year, item.volume, item.quantity]
         )
@@ -128,52 +998,68 @@ def export_import_by_country_csv():
     return StreamingResponse(
         io.BytesIO(output.getvalue().encode()),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=import_by_country.csv"},
+        headers={
+            "Content-Disposition": "attachment; filename=import_by_country.csv",
+            "X-Source-Version": str(version),
+        },
     )
 
 
 def import_import_by_country_csv(file_content: str):
-    reader = csv.DictReader(io.StringIO(file_content))
+    with write_batch():
+        reader = csv.DictReader(io.StringIO(file_content))
 
-    for row in reader:
-        item = ImportByCountry(
-            hs_code=row["hs_code"],
-            country=row["country"],
-            year=int(row["year"]),
-            volume=float(row["volume"]),
-            quantity=float(row["quantity"]),
-        )
-        save_import_by_country(item)
+        for row in reader:
+            item = ImportByCountry(
+                hs_code=row["hs_code"],
+                country=row["country"],
+                year=int(row["year"]),
+                volume=float(row["volume"]),
+                quantity=float(row["quantity"]),
+            )
+            save_import_by_country(item)
 
 
 # VolumeGeneral operations
-def get_volume_general() -> List[VolumeGeneral]:
+def get_volume_general() -> List[VolumeGeneralRow]:
     return get_source_data().volumes_general
 
 
 def save_volume_general(item: VolumeGeneral):
-    # Check if item already exists
-    found = False
-    for i, existing_item in enumerate(get_source_data().volumes_general):
-        if (
-            existing_item.hs_code == item.hs_code
-            and existing_item.type == item.type
-            and existing_item.year == item.year
-        ):
-            get_source_data().volumes_general[i] = item
-            found = True
-            break
+    item = _to_row("volumes_general", item)
+    with write_batch():
+        _log_upsert("volumes_general", item)
+        # Check if item already exists
+        old = None
+        for i, existing_item in enumerate(get_source_data().volumes_general):
+            if (
+                existing_item.hs_code == item.hs_code
+                and existing_item.type == item.type
+                and existing_item.year == item.year
+            ):
+                get_source_data().volumes_general[i] = item
+                old = existing_item
+                break
 
-    if not found:
-        get_source_data().volumes_general.append(item)
+        if old is None:
+            get_source_data().volumes_general.append(item)
+        _notify_change("volumes_general", old, item)
 
 
 def delete_volume_general(hs_code: str, type: str, year: int):
-    get_source_data().volumes_general = [
-        item
-        for item in get_source_data().volumes_general
-        if not (item.hs_code == hs_code and item.type == type and item.year == year)
-    ]
+    with write_batch():
+        source_data = get_source_data()
+        kept, removed = [], []
+        for item in source_data.volumes_general:
+            if item.hs_code == hs_code and item.type == type and item.year == year:
+                removed.append(item)
+            else:
+                kept.append(item)
+        if removed:
+            _log_delete("volumes_general", hs_code=hs_code, type=type, year=year)
+        source_data.volumes_general = kept
+        for item in removed:
+            _notify_change("volumes_general", item, None)
 
 
 def export_volume_general_csv():
@@ -181,77 +1067,101 @@ def export_volume_general_csv():
     writer = csv.writer(output)
     writer.writerow(["hs_code", "type", "year", "volume"])
 
-    for item in get_source_data().volumes_general:
+    rows, version = _table_snapshot("volumes_general")
+    for item in rows:
         writer.writerow([item.hs_code, item.type, item.year, item.volume])
 
     output.seek(0)
     return StreamingResponse(
         io.BytesIO(output.getvalue().encode()),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=volumes_general.csv"},
+        headers={
+            "Content-Disposition": "attachment; filename=volumes_general.csv",
+            "X-Source-Version": str(version),
+        },
     )
 
 
 def import_volume_general_csv(file_content: str):
-    reader = csv.DictReader(io.StringIO(file_content))
+    with write_batch():
+        reader = csv.DictReader(io.StringIO(file_content))
 
-    for row in reader:
-        item = VolumeGeneral(
-            hs_code=row["hs_code"],
-            type=row["type"],
-            year=int(row["year"]),
-            volume=float(row["volume"]),
-        )
-        save_volume_general(item)
+        for row in reader:
+            item = VolumeGeneral(
+                hs_code=row["hs_code"],
+                type=row["type"],
+                year=int(row["year"]),
+                volume=float(row["volume"]),
+            )
+            save_volume_general(item)
 
 
 # Restriction operations
-def get_restriction() -> List[Restriction]:
+def get_restriction() -> List[RestrictionRow]:
     return get_source_data().restrictions
 
 
 def save_restriction(item: Restriction):
-    # Check if item already exists
-    source_data = get_source_data()
-    found = False
-    for i, existing_item in enumerate(source_data.restrictions):
-        if existing_item.hs_code == item.hs_code and existing_item.key == item.key:
-            source_data.restrictions[i] = item
-            found = True
-            break
+    item = _to_row("restrictions", item)
+    with write_batch():
+        _log_upsert("restrictions", item)
+        # Check if item already exists
+        source_data = get_source_data()
+        old = None
+        for i, existing_item in enumerate(source_data.restrictions):
+            if existing_item.hs_code == item.hs_code and existing_item.key == item.key:
+                source_data.restrictions[i] = item
+                old = existing_item
+                break
 
-    if not found:
-        source_data.restrictions.append(item)
+        if old is None:
+            source_data.restrictions.append(item)
+        _notify_change("restrictions", old, item)
 
 
 def delete_restriction(hs_code: str, key: str):
-    source_data = get_source_data()
-    source_data.restrictions = [
-        item
-        for item in source_data.restrictions
-        if not (item.hs_code == hs_code and item.key == key)
-    ]
+    with write_batch():
+        source_data = get_source_data()
+        kept, removed = [], []
+        for item in source_data.restrictions:
+            if item.hs_code == hs_code and item.key == key:
+                removed.append(item)
+            else:
+                kept.append(item)
+        if removed:
+            _log_delete("restrictions", hs_code=hs_code, key=key)
+        source_data.restrictions = kept
+        for item in removed:
+            _notify_change("restrictions", item, None)
 
 
 def export_restriction_csv():
     output = io.StringIO()
     writer = csv.writer(output)
     writer.writerow(["hs_code", "key", "value"])
-    source_data = get_source_data()
-    for item in source_data.restrictions:
+    rows, version = _table_snapshot("restrictions")
+    for item in rows:
         writer.writerow([item.hs_code, item.key, item.value])
 
     output.seek(0)
     return StreamingResponse(
         io.BytesIO(output.getvalue().encode()),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=restrictions.csv"},
+        headers={
+            "Content-Disposition": "attachment; filename=restrictions.csv",
+            "X-Source-Version": str(version),
+        },
     )
 
 
 def import_restriction_csv(file_content: str):
-    reader = csv.DictReader(io.StringIO(file_content))
+    with write_batch():
+        reader = csv.DictReader(io.StringIO(file_content))
 
-    for row in reader:
-        item = Restriction(hs_code=row["hs_code"], key=row["key"], value=row["value"])
-        save_restriction(item)
+        for row in reader:
+            item = Restriction(
+                hs_code=row["hs_code"],
+                key=row["key"],
+                value=parse_restriction_value(row["value"]),
+            )
+            save_restriction(item)
@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+SPAN_KIND_SERVER = "SPAN_KIND_SERVER"
+SPAN_KIND_INTERNAL = "SPAN_KIND_INTERNAL"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_exporter_lock = threading.Lock()
+_exporter: Optional[logging.Logger] = None
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _Trace:
+    """Spans of one trace, exported together when the root span ends."""
+
+    def __init__(self):
+        self.trace_id = _new_id(16)
+        self.finished: List["Span"] = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"] = None,
+        kind: str = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        start_ns: Optional[int] = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.trace = parent.trace if parent else _Trace()
+        self.span_id = _new_id(8)
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def end(self, end_ns: Optional[int] = None):
+        self.end_ns = end_ns or time.time_ns()
+        with self.trace.lock:
+            self.trace.finished.append(self)
+        if self.parent is None:
+            _export(self.trace.finished)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent.span_id if self.parent else "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _attribute_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": (
+                {"code": "STATUS_CODE_ERROR", "message": self.error}
+                if self.error
+                else {"code": "STATUS_CODE_OK"}
+            ),
+        }
+
+
+def _get_exporter() -> logging.Logger:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            path = Path(settings.tracing_file)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=settings.tracing_max_bytes,
+                backupCount=settings.tracing_backup_count,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger = logging.getLogger("dashboard.tracing")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            logger.addHandler(handler)
+            _exporter = logger
+        return _exporter
+
+
+def _export(spans: List[Span]):
+    lines = "\n".join(
+        json.dumps(span.to_dict(), ensure_ascii=False)
+        for span in sorted(spans, key=lambda item: item.start_ns)
+    )
+    _get_exporter().info(lines)
+
+
+def tracing_enabled() -> bool:
+    return settings.tracing_enabled
+
+
+def start_span(
+    name: str,
+    kind: str = SPAN_KIND_INTERNAL,
+    start_ns: Optional[int] = None,
+    **attributes,
+) -> Optional[Span]:
+    """Create a child of the current span without making it current."""
+    if not settings.tracing_enabled:
+        return None
+    return Span(name, _current_span.get(), kind, attributes, start_ns)
+
+
+@contextmanager
+def span(name: str, kind: str = SPAN_KIND_INTERNAL, **attributes):
+    if not settings.tracing_enabled:
+        yield None
+        return
+    current = Span(name, _current_span.get(), kind, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening the root span for every HTTP request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.tracing_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+            await send(message)
+
+        with span(
+            f"HTTP {method}",
+            kind=SPAN_KIND_SERVER,
+            **{"http.method": method, "http.target": scope.get("path", "")},
+        ) as root:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                route_path = getattr(route, "path", None)
+                if route_path:
+                    root.name = f"HTTP {method} {route_path}"
+                    root.set_attribute("http.route", route_path)
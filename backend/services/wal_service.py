@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from services.metrics_service import counter, gauge, histogram
+
+WAL_RECORDS = counter("wal_records_total", "Records appended to the write-ahead log")
+WAL_FSYNCS = counter("wal_fsyncs_total", "fsync calls issued by the write-ahead log")
+WAL_FSYNC_DURATION = histogram(
+    "wal_fsync_duration_seconds", "Time spent writing and syncing one log batch"
+)
+WAL_SIZE = gauge("wal_size_bytes", "Size of the active write-ahead log")
+
+
+class WriteAheadLog:
+    """
+    Append-only JSON-lines log with group commit.
+
+    ``append`` only queues a record; a single writer thread writes everything
+    queued so far and fsyncs once, so concurrent writers share the cost of
+    each sync. ``wait_durable`` blocks until a given record is on disk.
+
+    Compaction moves the active log aside with ``rotate``; the moved segment
+    is kept until the caller has persisted a snapshot covering it.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.segment_path = path.with_name(path.name + ".compacting")
+        self._cond = threading.Condition()
+        self._pending: List[str] = []
+        self._appended_seq = 0
+        self._durable_seq = 0
+        self._file = None
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        self.size_bytes = 0
+        WAL_SIZE.set_callback(lambda: {(): self.size_bytes})
+
+    def read_records(self) -> Iterator[Dict[str, Any]]:
+        """
+        Records of the moved-aside segment, then of the active log.
+
+        A torn last line (crash mid-write) is dropped and cut off the file so
+        that new records are not appended onto it.
+        """
+        for path in (self.segment_path, self.path):
+            if not path.exists():
+                continue
+            good_bytes = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good_bytes += len(line)
+                    yield record
+            if good_bytes < path.stat().st_size:
+                with open(path, "r+b") as f:
+                    f.truncate(good_bytes)
+
+    def append(self, record: Dict[str, Any]) -> int:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._cond:
+            if self._thread is None:
+                self._open()
+            self._pending.append(line)
+            self._appended_seq += 1
+            self._cond.notify_all()
+            return self._appended_seq
+
+    @property
+    def last_seq(self) -> int:
+        return self._appended_seq
+
+    def wait_durable(self, seq: int):
+        with self._cond:
+            while self._durable_seq < seq:
+                if self._error is not None:
+                    raise RuntimeError("Write-ahead log failed") from self._error
+                self._cond.wait()
+
+    def rotate(self) -> Path:
+        """
+        Move the active log aside and start a new one. The caller must hold
+        off writers while this runs so the segment matches its snapshot.
+        """
+        self.wait_durable(self._appended_seq)
+        with self._cond:
+            if self._file is not None:
+                self._file.close()
+            if self.path.exists():
+                if self.segment_path.exists():
+                    # An earlier compaction did not finish: extend its segment
+                    with open(self.segment_path, "ab") as segment:
+                        segment.write(self.path.read_bytes())
+                        segment.flush()
+                        os.fsync(segment.fileno())
+                    self.path.unlink()
+                else:
+                    os.replace(self.path, self.segment_path)
+            # The writer thread opens the log itself on the first append
+            self._file = open(self.path, "ab") if self._thread is not None else None
+            self.size_bytes = 0
+            return self.segment_path
+
+    def discard_segment(self):
+        self.segment_path.unlink(missing_ok=True)
+
+    def filter_segment(self, keep: Callable[[Dict[str, Any]], bool]):
+        """Rewrite the moved-aside segment with only the records ``keep`` accepts."""
+        if not self.segment_path.exists():
+            return
+        tmp_path = self.segment_path.with_name(self.segment_path.name + ".tmp")
+        with open(self.segment_path, "rb") as segment, open(tmp_path, "wb") as f:
+            for line in segment:
+                if keep(json.loads(line)):
+                    f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.segment_path)
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self.size_bytes = self._file.tell()
+        self._thread = threading.Thread(
+            target=self._run, name="wal-writer", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                lines, self._pending = self._pending, []
+                target = self._appended_seq
+                log_file = self._file
+            # Appends keep queueing while this batch is written and synced
+            payload = ("\n".join(lines) + "\n").encode("utf-8")
+            started = time.perf_counter()
+            try:
+                log_file.write(payload)
+                log_file.flush()
+                os.fsync(log_file.fileno())
+            except BaseException as exc:
+                with self._cond:
+                    self._error = exc
+                    self._cond.notify_all()
+                return
+            WAL_FSYNC_DURATION.observe(time.perf_counter() - started)
+            WAL_FSYNCS.inc()
+            WAL_RECORDS.inc(len(lines))
+            with self._cond:
+                self.size_bytes += len(payload)
+                self._durable_seq = target
+                self._cond.notify_all()
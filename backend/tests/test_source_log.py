@@ -0,0 +1,62 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from config import settings
+from models.source import Restriction
+from services import source_service
+from services.wal_service import WriteAheadLog
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Serve a scratch copy of data/ with a write-ahead log of its own."""
+    shutil.copytree(DATA_DIR, tmp_path / "data")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(settings, "wal_enabled", True)
+    monkeypatch.setattr(
+        source_service, "_source_log", WriteAheadLog(Path(settings.wal_file))
+    )
+    monkeypatch.setattr(source_service, "_source_is_loaded", False)
+    return tmp_path / "data"
+
+
+def _stored_value(hs_code: str, key: str):
+    """The value a restart would serve: the CSVs with the log replayed."""
+    source = source_service._load_source_data()
+    source_service._replay_log(source)
+    return next(
+        item.value
+        for item in source.restrictions
+        if item.hs_code == hs_code and item.key == key
+    )
+
+
+@pytest.mark.parametrize(
+    "value", [True, False, 0, 0.065, 5.0, "True", "0.5", "", None, 'a, "b"']
+)
+def test_restriction_value_is_the_same_after_replay_and_compaction(data_dir, value):
+    source_service.save_restriction(
+        Restriction(hs_code="842810", key="tech_regulations_present", value=value)
+    )
+    replayed = _stored_value("842810", "tech_regulations_present")
+
+    source_service.compact_source_log()
+    assert not source_service._source_log.segment_path.exists()
+    compacted = _stored_value("842810", "tech_regulations_present")
+
+    assert (replayed, type(replayed)) == (value, type(value))
+    assert (compacted, type(compacted)) == (replayed, type(replayed))
+
+
+def test_bundled_restriction_values_are_typed(data_dir):
+    values = {
+        item.key: item.value
+        for item in source_service._load_source_data().restrictions
+        if item.hs_code == "330300"
+    }
+    assert values["customs_duty_rate"] == 0.065
+    assert values["tech_regulations_present"] is False
@@ -27,6 +27,22 @@ export type ContractPriceItem = {
   country_code?: string;
 };
 
+export type RegionShareItem = {
+  year: number;
+  region: string;
+  volume: number;
+  quantity: number;
+  share_percent: number;
+};
+
+export type FriendlinessShareItem = {
+  year: number;
+  is_friendly: boolean;
+  volume: number;
+  quantity: number;
+  share_percent: number;
+};
+
 export type ImpactMeasure = {
   measure: string;
   before: number;
@@ -66,6 +82,8 @@ export type DashboardData = {
   prices: ContractPriceItem[];
   recommendations: Recommendation[];
   share_url: string;
+  regions?: RegionShareItem[];
+  friendliness?: FriendlinessShareItem[];
 };
 
 export type DashboardResponse = {